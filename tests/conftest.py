@@ -1,6 +1,8 @@
 import sys
 import os
 
+import pytest
+
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(root_dir)
@@ -32,3 +34,16 @@ pytest_plugins = [
     'fixtures.fixture_user',
     'fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings, tmp_path):
+    """Кеш не чистится вместе с тестовой БД: сбрасываем его перед тестом.
+
+    Файловый кеш переносится во временный каталог, чтобы не стирать
+    рабочий yatube/cache.
+    """
+    from django.core.cache import cache
+    from yatube.test_runner import temporary_caches
+    settings.CACHES = temporary_caches(str(tmp_path))
+    cache.clear()
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post
+from .search import search_posts
 
 EMPTY_VALUE_DISPLAY = '-пусто-'
 
@@ -11,6 +12,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = EMPTY_VALUE_DISPLAY
 
+    def get_search_results(self, request, queryset, search_term):
+        # поиск по тексту идёт через полнотекстовый индекс, а не LIKE
+        if not search_term:
+            return queryset, False
+        return search_posts(queryset, search_term, ranked=False), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -0,0 +1,79 @@
+import datetime as dt
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from yatube.db_router import read_source
+
+FEED_VERSION_KEY = 'posts:feed-version:{scope}:{object_id}'
+# Версия каталога подборок: меняется при изменении подборок, но не
+# записей - статистика каталога устаревает не дольше его времени жизни
+GROUP_DIRECTORY_SCOPE = 'group-directory'
+
+
+def _initial_version():
+    # версия, начатая со времени, не совпадёт с версиями фрагментов,
+    # закешированных до того, как ключ версии был вытеснен из кеша
+    return time.time_ns()
+
+
+def feed_version(scope, object_id=0):
+    """Текущая версия ленты scope/object_id, заводит её при отсутствии."""
+    key = FEED_VERSION_KEY.format(scope=scope, object_id=object_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key, _initial_version())
+    return version
+
+
+def bump_feed_version(scope, object_id=0):
+    """Сменить версию ленты: все её закешированные страницы устаревают."""
+    key = FEED_VERSION_KEY.format(scope=scope, object_id=object_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def feed_cache_context(request, page, scope, object_id=0, vary_on=(),
+                       timeout=None):
+    """Переменные шаблона для фрагментного кеша страницы ленты.
+
+    Ключ собирается из ленты (scope, object_id), её версии, источника
+    чтения (основная БД или копия реплики), размера и позиции страницы
+    (номер или курсор) и дополнительных vary_on, от которых зависит
+    разметка фрагмента. timeout - время жизни фрагмента,
+    по умолчанию FEED_CACHE_TIMEOUT.
+
+    return - словарь с feed_cache_key и feed_cache_timeout для тега cache
+    """
+    if getattr(page, 'is_keyset', False):
+        position = (f"after={request.GET.get('after', '')}"
+                    f"&before={request.GET.get('before', '')}")
+    else:
+        position = page.number
+    parts = [scope, object_id, feed_version(scope, object_id),
+             read_source(), page.paginator.per_page, position, *vary_on]
+    return {
+        'feed_cache_key': ':'.join(str(part) for part in parts),
+        'feed_cache_timeout': (settings.FEED_CACHE_TIMEOUT
+                               if timeout is None else timeout),
+    }
+
+
+def feed_etag(request, scope, object_id=0):
+    """ETag страницы, построенной по ленте scope/object_id.
+
+    Меняется вместе с версией ленты (новая, изменённая или удалённая
+    запись), с источником чтения (страница с реплики отстаёт от
+    основной БД до её синхронизации), с пользователем, для которого
+    страница собрана (меню и ссылки редактирования), и с годом в подвале
+    сайта. Вычисляется без обращения к шаблонам и к таблице записей.
+    """
+    user_id = request.user.pk if request.user.is_authenticated else 0
+    raw = (f'{scope}:{object_id}:{feed_version(scope, object_id)}:'
+           f'{read_source()}:{user_id}:{dt.date.today().year}')
+    return hashlib.md5(raw.encode()).hexdigest()
@@ -0,0 +1,192 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import truncatechars
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .caching import feed_version
+from .models import Group, Post, PostCounter, User
+
+FEED_BODY_KEY = 'posts:syndication:{etag}'
+
+
+class StreamingFeedMixin:
+    """Выдача ленты по частям: шапка, записи по одной, закрывающие теги.
+
+    Шапка и хвост получаются обычным write() с меткой вместо записей,
+    поэтому разметка совпадает с родительским классом ленты.
+    """
+    ITEMS_MARKER = '\x00items\x00'
+    item_element = None
+    _streaming = False
+
+    def write_items(self, handler):
+        if self._streaming:
+            handler.ignorableWhitespace(self.ITEMS_MARKER)
+        else:
+            super().write_items(handler)
+
+    def stream(self, encoding):
+        skeleton = io.StringIO()
+        self._streaming = True
+        try:
+            self.write(skeleton, encoding)
+        finally:
+            self._streaming = False
+        head, tail = skeleton.getvalue().split(self.ITEMS_MARKER)
+        yield head
+        for item in self.items:
+            buffer = io.StringIO()
+            handler = SimplerXMLGenerator(buffer, encoding)
+            handler.startElement(self.item_element,
+                                 self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield buffer.getvalue()
+        yield tail
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    item_element = 'entry'
+
+
+class PostsFeed(Feed):
+    """Лента последних записей сайта.
+
+    Ответ отдаётся потоком и кешируется целиком по версии ленты, а
+    ETag из той же версии позволяет клиенту получить 304 без тела.
+    """
+    feed_type = StreamingRssFeed
+    title = 'Yatube: последние записи'
+    description = 'Последние записи на сайте Yatube'
+
+    def scope(self, obj):
+        return PostCounter.SCOPE_ALL, 0
+
+    def link(self, obj):
+        return reverse('index')
+
+    def items(self, obj):
+        return Post.objects.feed('text')[:settings.SYNDICATION_FEED_SIZE]
+
+    def item_title(self, item):
+        return truncatechars(item.text, 80)
+
+    def item_description(self, item):
+        return item.text_rendered
+
+    def item_link(self, item):
+        return reverse('post', kwargs={'username': item.author.username,
+                                       'post_id': item.id})
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def __call__(self, request, *args, **kwargs):
+        obj = self.get_object(request, *args, **kwargs)
+        scope, object_id = self.scope(obj)
+        # ссылки в ленте абсолютные, поэтому версия зависит и от хоста
+        raw = (f'{scope}:{object_id}:{feed_version(scope, object_id)}:'
+               f'{self.feed_type.__name__}:{request.get_host()}')
+        etag = '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            key = FEED_BODY_KEY.format(etag=etag.strip('"'))
+            body = cache.get(key)
+            if body is not None:
+                response = HttpResponse(body)
+            else:
+                feedgen = self.get_feed(obj, request)
+                response = StreamingHttpResponse(
+                    self.caching_stream(feedgen, key))
+            response['Content-Type'] = self.feed_type.content_type
+        response['ETag'] = etag
+        return response
+
+    @staticmethod
+    def caching_stream(feedgen, key):
+        """Отдавать части ленты и сохранить её в кеш, когда она собрана."""
+        chunks = []
+        for chunk in feedgen.stream(settings.DEFAULT_CHARSET):
+            chunks.append(chunk)
+            yield chunk
+        cache.set(key, ''.join(chunks), settings.FEED_CACHE_TIMEOUT)
+
+
+class AtomPostsFeed(PostsFeed):
+    feed_type = StreamingAtomFeed
+    subtitle = PostsFeed.description
+
+
+class GroupPostsFeed(PostsFeed):
+    """Лента последних записей подборки."""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def scope(self, obj):
+        return PostCounter.SCOPE_GROUP, obj.id
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('group', kwargs={'slug': obj.slug})
+
+    def items(self, obj):
+        return obj.posts.feed('text')[:settings.SYNDICATION_FEED_SIZE]
+
+
+class AtomGroupPostsFeed(GroupPostsFeed):
+    feed_type = StreamingAtomFeed
+
+    def subtitle(self, obj):
+        return obj.description
+
+
+class AuthorPostsFeed(PostsFeed):
+    """Лента последних записей автора."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def scope(self, obj):
+        return PostCounter.SCOPE_AUTHOR, obj.id
+
+    def title(self, obj):
+        return f'Yatube: записи @{obj.username}'
+
+    def description(self, obj):
+        return f'Последние записи пользователя @{obj.username}'
+
+    def link(self, obj):
+        return reverse('profile', kwargs={'username': obj.username})
+
+    def items(self, obj):
+        return obj.posts.feed('text')[:settings.SYNDICATION_FEED_SIZE]
+
+
+class AtomAuthorPostsFeed(AuthorPostsFeed):
+    feed_type = StreamingAtomFeed
+
+    def subtitle(self, obj):
+        return self.description(obj)
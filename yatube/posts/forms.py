@@ -1,6 +1,9 @@
 from django import forms
+from django.conf import settings
 
+from .group_choices import CachedGroupChoiceIterator
 from .models import Post
+from .widgets import GroupTypeahead
 
 
 class PostForm(forms.ModelForm):
@@ -17,3 +20,14 @@ class PostForm(forms.ModelForm):
             'group': ('Группа постов, она же подборка записей, в которой'
                       ' Вы желаете разместить своё сообщение.'),
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        group = self.fields['group']
+        # варианты - из кеша, а не из запроса ко всем подборкам; само
+        # поле остаётся ModelChoiceField и проверяет выбор по queryset
+        group.iterator = CachedGroupChoiceIterator
+        if settings.POSTS_GROUP_TYPEAHEAD:
+            group.widget = GroupTypeahead()
+            group.widget.is_required = group.required
+        group.widget.choices = group.choices
@@ -0,0 +1,102 @@
+"""Список подборок для формы записи из версионного кеша.
+
+Поле group формы PostForm перечисляет все подборки. Вместо запроса ко
+всей таблице на каждый показ формы пары (id, title) берутся из кеша под
+ключом с версией; версия меняется при сохранении и удалении подборки
+(posts/signals.py), и следующий показ формы собирает список заново.
+Внутри процесса разобранный список хранится до смены версии.
+
+По тому же списку строится отсортированный индекс названий для поиска
+подборок по началу названия (group_lookup) без запросов к БД.
+"""
+import bisect
+import time
+
+from django.core.cache import cache
+from django.forms.models import ModelChoiceIterator
+
+from .models import Group
+
+GROUP_CHOICES_KEY = 'posts:group-choices:{version}'
+GROUP_CHOICES_VERSION_KEY = 'posts:group-choices-version'
+# сколько подборок отдаёт group_lookup по умолчанию и самое большее
+LOOKUP_LIMIT = 10
+LOOKUP_MAX_LIMIT = 50
+
+# (версия, список, индекс) для текущего процесса
+_memo = (None, None, None)
+
+
+def choices_version():
+    version = cache.get(GROUP_CHOICES_VERSION_KEY)
+    if version is None:
+        # версия со времени не совпадёт со списками, закешированными до
+        # вытеснения ключа версии
+        cache.add(GROUP_CHOICES_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(GROUP_CHOICES_VERSION_KEY, 0)
+    return version
+
+
+def bump_choices_version():
+    """Список подборок в кеше устарел."""
+    try:
+        cache.incr(GROUP_CHOICES_VERSION_KEY)
+    except ValueError:
+        cache.set(GROUP_CHOICES_VERSION_KEY, time.time_ns(), None)
+
+
+def _load():
+    global _memo
+    version = choices_version()
+    if _memo[0] != version:
+        key = GROUP_CHOICES_KEY.format(version=version)
+        choices = cache.get(key)
+        if choices is None:
+            choices = list(Group.objects.values_list('id', 'title'))
+            cache.set(key, choices)
+        index = sorted((title.casefold(), title, pk) for pk, title in choices)
+        _memo = (version, choices, index)
+    return _memo
+
+
+def group_choices():
+    """[(id, title)] всех подборок в порядке Group.Meta.ordering."""
+    return _load()[1]
+
+
+def lookup_groups(prefix, limit=LOOKUP_LIMIT):
+    """Подборки, название которых начинается с prefix, без учёта регистра.
+
+    return - [(id, title)] по алфавиту, не больше limit
+    """
+    prefix = prefix.strip().casefold()
+    if not prefix:
+        return []
+    index = _load()[2]
+    start = bisect.bisect_left(index, (prefix,))
+    found = []
+    for folded, title, pk in index[start:start + limit]:
+        if not folded.startswith(prefix):
+            break
+        found.append((pk, title))
+    return found
+
+
+class CachedGroupChoiceIterator(ModelChoiceIterator):
+    """Варианты поля group из group_choices() вместо запроса к queryset.
+
+    Назначается экземпляру поля (field.iterator): поле остаётся обычным
+    ModelChoiceField и проверяет выбранное значение запросом к queryset.
+    """
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from group_choices()
+
+    def __len__(self):
+        return (len(group_choices())
+                + (self.field.empty_label is not None))
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(group_choices())
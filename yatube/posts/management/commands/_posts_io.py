@@ -0,0 +1,78 @@
+"""Общие для import_posts и export_posts формат и служебные функции."""
+import contextlib
+import os
+import sys
+import time
+
+from django.db import connections, router
+
+from posts.models import Post
+
+# Колонки файла выгрузки: автор и подборка - по username и slug
+FIELDS = ('text', 'pub_date', 'author', 'group')
+FORMATS = ('jsonl', 'csv')
+
+
+def detect_format(path, requested):
+    if requested:
+        return requested
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return extension if extension in FORMATS else 'jsonl'
+
+
+@contextlib.contextmanager
+def open_stream(path, mode):
+    """Файл по пути или stdin/stdout для '-'; всегда текстовый UTF-8."""
+    if path == '-':
+        stream = sys.stdin if 'r' in mode else sys.stdout
+        yield stream
+        stream.flush()
+        return
+    with open(path, mode, encoding='utf-8', newline='') as stream:
+        yield stream
+
+
+def insert_posts(posts):
+    """Вставить записи как bulk_create, не затирая заданный pub_date.
+
+    pub_date - поле с auto_now_add: bulk_create проставил бы ему текущее
+    время. Вставка в режиме raw, как при loaddata, берёт значения полей
+    из объектов и не трогает настройки модели.
+    """
+    fields = [field for field in Post._meta.concrete_fields
+              if not field.primary_key]
+    alias = router.db_for_write(Post)
+    # пачки не больше предела переменных в запросе, как у bulk_create
+    size = max(connections[alias].ops.bulk_batch_size(fields, posts), 1)
+    for start in range(0, len(posts), size):
+        Post.objects._insert(posts[start:start + size], fields=fields,
+                             raw=True, using=alias)
+
+
+class Progress:
+    """Счётчик строк со скоростью, печатает отчёт не чаще раза в секунду."""
+
+    def __init__(self, out, verb):
+        self.out = out
+        self.verb = verb
+        self.rows = 0
+        self.started = time.monotonic()
+        self.reported = self.started
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed else 0
+
+    def add(self, rows):
+        self.rows += rows
+        now = time.monotonic()
+        if now - self.reported >= 1:
+            self.reported = now
+            self.out.write(
+                f'{self.verb}: {self.rows} ({self.rate:.0f} строк/с)')
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        return (f'{self.verb}: {self.rows} за {elapsed:.1f} с '
+                f'({self.rate:.0f} строк/с)')
@@ -0,0 +1,219 @@
+import asyncio
+import datetime as dt
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.asgi import WsgiToAsgi
+
+PERCENTILES = (50, 90, 99)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает WSGI и ASGI-переходник при одном и том же числе '
+            'потоков-обработчиков: пропускную способность и задержки '
+            'страниц только для чтения при разном числе одновременных '
+            'клиентов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int,
+                            default=settings.ASGI_THREADS,
+                            help='число потоков-обработчиков в обоих режимах')
+        parser.add_argument('--concurrency', default='1,8,32',
+                            help='числа одновременных клиентов через запятую')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='запросов на каждое число клиентов')
+        parser.add_argument('--db-delay', type=float, default=0,
+                            help='искусственная задержка каждого запроса '
+                                 'к БД, мс (имитация медленной БД)')
+        parser.add_argument('--output', default='bench_concurrency.json')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level)
+                      for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency: ожидаются числа через запятую')
+        threads = options['threads']
+        scopes = self.scopes()
+        handler = WSGIHandler()
+        asgi_application = WsgiToAsgi(handler, max_workers=threads)
+
+        results = []
+        with self.slow_database(options['db_delay'] / 1000):
+            for concurrency in levels:
+                jobs = [scopes[i % len(scopes)]
+                        for i in range(options['requests'])]
+                runs = (
+                    ('wsgi', lambda: self.run_wsgi(
+                        handler, threads, concurrency, jobs)),
+                    ('asgi', lambda: asyncio.run(self.run_asgi(
+                        asgi_application, concurrency, jobs))),
+                )
+                for mode, run in runs:
+                    started = time.perf_counter()
+                    timings = run()
+                    elapsed = time.perf_counter() - started
+                    results.append(self.summarize(
+                        mode, threads, concurrency, timings, elapsed))
+        asgi_application.executor.shutdown()
+
+        report = {
+            'meta': {
+                'created': dt.datetime.now().isoformat(),
+                'threads': threads,
+                'requests': options['requests'],
+                'db_delay_ms': options['db_delay'],
+                'paths': sorted({scope['path'] for scope in scopes}),
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            json.dump(report, stream, ensure_ascii=False, indent=2)
+
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']} clients={row['concurrency']:<4} "
+                f"rps={row['rps']:>8.1f} p50={row['p50_ms']:>8.2f}ms "
+                f"p99={row['p99_ms']:>8.2f}ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Результат сохранён в {options['output']}"))
+
+    def scopes(self):
+        """ASGI scope для страниц только для чтения."""
+        post = Post.objects.select_related('author', 'group').filter(
+            group__isnull=False).order_by('id').first()
+        if post is None:
+            raise CommandError('БД пуста: сначала запустите seed_posts')
+        username = post.author.username
+        paths = (
+            reverse('index'),
+            reverse('group', kwargs={'slug': post.group.slug}),
+            reverse('group_index'),
+            reverse('profile', kwargs={'username': username}),
+            reverse('post', kwargs={'username': username,
+                                    'post_id': post.id}),
+        )
+        return [{'type': 'http', 'method': 'GET', 'path': path,
+                 'query_string': b'', 'http_version': '1.1',
+                 'server': ('localhost', 80),
+                 'headers': [(b'host', b'localhost')]}
+                for path in paths]
+
+    @staticmethod
+    @contextmanager
+    def slow_database(delay):
+        """Добавить задержку к каждому запросу к БД на время замера."""
+        if delay <= 0:
+            yield
+            return
+
+        def wrapper(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def install(**kwargs):
+            connection.execute_wrappers.append(wrapper)
+
+        def uninstall(**kwargs):
+            if wrapper in connection.execute_wrappers:
+                connection.execute_wrappers.remove(wrapper)
+
+        request_started.connect(install)
+        request_finished.connect(uninstall)
+        try:
+            yield
+        finally:
+            request_started.disconnect(install)
+            request_finished.disconnect(uninstall)
+
+    @staticmethod
+    def call_wsgi(handler, scope):
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split(' ', 1)[0]))
+
+        result = handler(WsgiToAsgi.build_environ(scope, b''),
+                         start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            result.close()
+        return status[0]
+
+    def run_wsgi(self, handler, threads, concurrency, jobs):
+        """Клиенты-потоки ставят запросы в пул из threads обработчиков."""
+        with ThreadPoolExecutor(threads) as workers:
+            def client(batch):
+                timings = []
+                for scope in batch:
+                    started = time.perf_counter()
+                    status = workers.submit(
+                        self.call_wsgi, handler, scope).result()
+                    timings.append(time.perf_counter() - started)
+                    self.check(scope, status)
+                return timings
+
+            with ThreadPoolExecutor(concurrency) as clients:
+                batches = [jobs[i::concurrency] for i in range(concurrency)]
+                return [timing for timings in clients.map(client, batches)
+                        for timing in timings]
+
+    async def call_asgi(self, application, scope):
+        status = []
+        messages = [{'type': 'http.request', 'body': b''}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await application(scope, receive, send)
+        return status[0]
+
+    async def run_asgi(self, application, concurrency, jobs):
+        """Клиенты-задачи одного событийного цикла."""
+
+        async def client(batch):
+            timings = []
+            for scope in batch:
+                started = time.perf_counter()
+                status = await self.call_asgi(application, scope)
+                timings.append(time.perf_counter() - started)
+                self.check(scope, status)
+            return timings
+
+        batches = [jobs[i::concurrency] for i in range(concurrency)]
+        results = await asyncio.gather(*map(client, batches))
+        return [timing for timings in results for timing in timings]
+
+    @staticmethod
+    def check(scope, status):
+        if status != 200:
+            raise CommandError(f"{scope['path']}: ответ {status}")
+
+    @staticmethod
+    def summarize(mode, threads, concurrency, timings, elapsed):
+        timings.sort()
+        row = {'mode': mode, 'threads': threads, 'concurrency': concurrency,
+               'requests': len(timings),
+               'rps': round(len(timings) / elapsed, 1)}
+        for percentile in PERCENTILES:
+            index = min(len(timings) - 1, len(timings) * percentile // 100)
+            row[f'p{percentile}_ms'] = round(timings[index] * 1000, 2)
+        return row
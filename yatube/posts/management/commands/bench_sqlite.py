@@ -0,0 +1,173 @@
+import datetime as dt
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yatube.db_backends.sqlite3.base import apply_pragmas
+
+PERCENTILES = (50, 90, 99)
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT NOT NULL, '
+    'pub_date TEXT NOT NULL)',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+)
+READ_SQL = ('SELECT id, text, pub_date FROM post '
+            'ORDER BY pub_date DESC LIMIT 10')
+WRITE_SQL = 'INSERT INTO post (text, pub_date) VALUES (?, ?)'
+
+
+def profiles():
+    """Настройки по умолчанию Django и профиль из settings."""
+    tuned = settings.DATABASES['default']
+    return {
+        # журнал отката, synchronous = full, новое соединение на запрос
+        'default': {'pragmas': {}, 'timeout': 5, 'reuse': False},
+        'tuned': {'pragmas': tuned['OPTIONS'].get('pragmas', {}),
+                  'timeout': tuned['OPTIONS'].get('timeout', 5),
+                  'reuse': bool(tuned.get('CONN_MAX_AGE'))},
+    }
+
+
+class Worker(threading.Thread):
+    """Поток, выполняющий чтения или записи до истечения deadline."""
+
+    def __init__(self, path, profile, write, deadline):
+        super().__init__(daemon=True)
+        self.path = path
+        self.profile = profile
+        self.write = write
+        self.deadline = deadline
+        self.timings = []
+        self.locked = 0
+
+    def connect(self):
+        connection = sqlite3.connect(self.path,
+                                     timeout=self.profile['timeout'],
+                                     check_same_thread=False)
+        apply_pragmas(connection, self.profile['pragmas'])
+        return connection
+
+    def operation(self, connection):
+        if self.write:
+            connection.execute(WRITE_SQL, ('Запись из замера',
+                                           dt.datetime.now().isoformat()))
+            connection.commit()
+        else:
+            connection.execute(READ_SQL).fetchall()
+
+    def run(self):
+        connection = self.connect() if self.profile['reuse'] else None
+        while time.monotonic() < self.deadline:
+            started = time.perf_counter()
+            current = connection or self.connect()
+            try:
+                self.operation(current)
+            except sqlite3.OperationalError as error:
+                if 'locked' not in str(error):
+                    raise
+                self.locked += 1
+                current.rollback()
+            finally:
+                if connection is None:
+                    current.close()
+            self.timings.append(time.perf_counter() - started)
+        if connection is not None:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает SQLite с настройками по умолчанию и с профилем '
+            'из settings (WAL, PRAGMA, постоянные соединения) под '
+            'одновременными чтениями и записями')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5,
+                            help='секунд на каждый профиль')
+        parser.add_argument('--rows', type=int, default=10000,
+                            help='записей в таблице перед замером')
+        parser.add_argument('--output', default='bench_sqlite.json')
+
+    def handle(self, *args, **options):
+        results = []
+        for name, profile in profiles().items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.prepare(path, profile, options['rows'])
+                results.extend(self.measure(name, path, profile, options))
+
+        report = {
+            'meta': {
+                'created': dt.datetime.now().isoformat(),
+                'readers': options['readers'],
+                'writers': options['writers'],
+                'duration': options['duration'],
+                'rows': options['rows'],
+                'sqlite_version': sqlite3.sqlite_version,
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            json.dump(report, stream, ensure_ascii=False, indent=2)
+
+        for row in results:
+            self.stdout.write(
+                f"{row['profile']:<8} {row['operation']:<6} "
+                f"ops/s={row['ops_per_second']:>9.1f} "
+                f"p50={row['p50_ms']:>8.2f}ms p99={row['p99_ms']:>8.2f}ms "
+                f"locked={row['locked']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Результат сохранён в {options['output']}"))
+
+    @staticmethod
+    def prepare(path, profile, rows):
+        connection = sqlite3.connect(path)
+        try:
+            apply_pragmas(connection, profile['pragmas'])
+            for statement in SCHEMA:
+                connection.execute(statement)
+            started = dt.datetime(2020, 1, 1)
+            connection.executemany(WRITE_SQL, (
+                (f'Запись №{i}', (started + dt.timedelta(minutes=i))
+                 .isoformat()) for i in range(rows)))
+            connection.commit()
+        finally:
+            connection.close()
+
+    def measure(self, name, path, profile, options):
+        deadline = time.monotonic() + options['duration']
+        workers = ([Worker(path, profile, False, deadline)
+                    for _ in range(options['readers'])]
+                   + [Worker(path, profile, True, deadline)
+                      for _ in range(options['writers'])])
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        rows = []
+        for operation, write in (('read', False), ('write', True)):
+            group = [worker for worker in workers if worker.write == write]
+            timings = sorted(timing for worker in group
+                             for timing in worker.timings)
+            if not timings:
+                continue
+            row = {'profile': name, 'operation': operation,
+                   'operations': len(timings),
+                   'ops_per_second': round(
+                       len(timings) / options['duration'], 1),
+                   'locked': sum(worker.locked for worker in group)}
+            for percentile in PERCENTILES:
+                index = min(len(timings) - 1,
+                            len(timings) * percentile // 100)
+                row[f'p{percentile}_ms'] = round(timings[index] * 1000, 2)
+            rows.append(row)
+        return rows
@@ -0,0 +1,173 @@
+import datetime as dt
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.paginators import KeysetPaginator
+
+PERCENTILES = (50, 90, 99)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержки (перцентили) и число запросов к БД для '
+            'каждого адреса posts/urls.py на первой, средней и последней '
+            'странице лент; результат сохраняется в JSON и сравнивается '
+            'с прошлым замером')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='запросов на каждый адрес')
+        parser.add_argument('--cold', action='store_true',
+                            help='очищать кеш перед каждым запросом')
+        parser.add_argument('--output', default='bench_views.json')
+        parser.add_argument('--baseline',
+                            help='JSON прошлого замера для сравнения')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='допустимый рост p50, доля')
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('author', 'group').filter(
+            group__isnull=False).order_by('id').first()
+        if post is None:
+            raise CommandError('БД пуста: сначала запустите seed_posts')
+        author, group = post.author, post.group
+
+        self.client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(author)
+
+        targets = []
+        feeds = (
+            ('index', {}, Post.objects.all()),
+            ('group', {'slug': group.slug}, group.posts.all()),
+            ('profile', {'username': author.username}, author.posts.all()),
+        )
+        for name, kwargs, queryset in feeds:
+            for position, query in self.page_queries(queryset):
+                targets.append((name, position, reverse(name, kwargs=kwargs),
+                                query, self.client))
+        groups = Group.objects.count()
+        for position, query in self.numbered_queries(groups):
+            targets.append(('group_index', position, reverse('group_index'),
+                            query, self.client))
+        post_kwargs = {'username': author.username, 'post_id': post.id}
+        targets += [
+            ('post', 'first', reverse('post', kwargs=post_kwargs), {},
+             self.client),
+            ('post_edit', 'first', reverse('post_edit', kwargs=post_kwargs),
+             {}, self.author_client),
+            ('new_post', 'first', reverse('new_post'), {},
+             self.author_client),
+            ('search', 'first', reverse('search'),
+             {'q': post.text.split()[0]}, self.client),
+            ('feed', 'first', reverse('feed'), {}, self.client),
+        ]
+
+        results = [self.measure(*target, options) for target in targets]
+        report = {
+            'meta': {
+                'created': dt.datetime.now().isoformat(),
+                'paginator_mode': settings.PAGINATOR_MODE,
+                'page_size': settings.PAGINATOR_DEFAULT_SIZE,
+                'repeat': options['repeat'],
+                'cold': options['cold'],
+                'users': User.objects.count(),
+                'groups': groups,
+                'posts': Post.objects.count(),
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            json.dump(report, stream, ensure_ascii=False, indent=2)
+
+        for row in results:
+            self.stdout.write(
+                f"{row['view']:<12} {row['page']:<7} "
+                f"p50={row['p50_ms']:>8.2f}ms p90={row['p90_ms']:>8.2f}ms "
+                f"p99={row['p99_ms']:>8.2f}ms queries={row['queries']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Результат сохранён в {options['output']}"))
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def page_queries(self, queryset):
+        """GET-параметры первой, средней и последней страницы ленты."""
+        size = settings.PAGINATOR_DEFAULT_SIZE
+        if settings.PAGINATOR_MODE != 'keyset':
+            yield from self.numbered_queries(queryset.count())
+            return
+        paginator = KeysetPaginator(queryset, size)
+        ordered = queryset.order_by(*paginator.ordering)
+        total = queryset.count()
+        pages = max(1, -(-total // size))
+        yield 'first', {}
+        for position, page in (('middle', pages // 2), ('deep', pages - 1)):
+            if page < 1:
+                continue
+            # курсор последней записи предыдущей страницы
+            anchor = ordered[page * size - 1]
+            yield position, {'after': paginator.encode_cursor(anchor)}
+
+    @staticmethod
+    def numbered_queries(total):
+        pages = max(1, -(-total // settings.PAGINATOR_DEFAULT_SIZE))
+        return (('first', {'page': 1}),
+                ('middle', {'page': max(1, pages // 2)}),
+                ('deep', {'page': pages}))
+
+    def measure(self, view, position, url, query, client, options):
+        timings = []
+        queries = 0
+        for _ in range(options['repeat']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url, query)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{url} {query}: ответ {response.status_code}')
+            queries = max(queries, len(captured))
+        timings.sort()
+        row = {'view': view, 'page': position, 'url': url, 'query': query,
+               'queries': queries,
+               'mean_ms': round(statistics.mean(timings) * 1000, 2)}
+        for percentile in PERCENTILES:
+            index = min(len(timings) - 1, len(timings) * percentile // 100)
+            row[f'p{percentile}_ms'] = round(timings[index] * 1000, 2)
+        return row
+
+    def compare(self, results, baseline_path, tolerance):
+        with open(baseline_path, encoding='utf-8') as stream:
+            baseline = {(row['view'], row['page']): row
+                        for row in json.load(stream)['results']}
+        regressions = []
+        for row in results:
+            before = baseline.get((row['view'], row['page']))
+            if before is None:
+                continue
+            if row['queries'] > before['queries']:
+                regressions.append(
+                    f"{row['view']}/{row['page']}: запросов "
+                    f"{before['queries']} -> {row['queries']}")
+            if row['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+                regressions.append(
+                    f"{row['view']}/{row['page']}: p50 "
+                    f"{before['p50_ms']} -> {row['p50_ms']} мс")
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS(
+            'Регрессий относительно прошлого замера нет'))
@@ -0,0 +1,126 @@
+import datetime as dt
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.forms import PostForm
+from posts.models import Group, Post, User
+from posts.write_queue import WriteQueue
+
+BENCH_USERNAME = 'bench_writer_{number}'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает устойчивую скорость публикации записей: '
+            'сохранение в каждом запросе и отложенную запись пачками '
+            '(posts/write_queue.py). Каждый клиент публикует от своего '
+            'пользователя; записи замера удаляются вместе с ними')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8,
+                            help='одновременно публикующих потоков')
+        parser.add_argument('--posts', type=int, default=2000,
+                            help='записей на каждый режим')
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.WRITE_QUEUE_BATCH_SIZE)
+        parser.add_argument('--flush-ms', type=float,
+                            default=settings.WRITE_QUEUE_FLUSH_MS)
+        parser.add_argument('--output', default='bench_writes.json')
+
+    def handle(self, *args, **options):
+        authors = [User.objects.get_or_create(
+            username=BENCH_USERNAME.format(number=number))[0]
+            for number in range(options['clients'])]
+        group = Group.objects.order_by('id').first()
+        data = {'text': 'Запись из замера публикации'}
+        if group is not None:
+            data['group'] = group.id
+
+        results = []
+        try:
+            for mode in ('direct', 'queue'):
+                queue = None
+                if mode == 'queue':
+                    queue = WriteQueue(options['batch_size'],
+                                       options['flush_ms'] / 1000)
+                    queue.start()
+                results.append(self.measure(mode, authors, data, queue,
+                                            options))
+        finally:
+            # удаление авторов удаляет их записи и поправляет счётчики
+            for author in authors:
+                author.delete()
+
+        report = {
+            'meta': {
+                'created': dt.datetime.now().isoformat(),
+                'clients': options['clients'],
+                'posts': options['posts'],
+                'batch_size': options['batch_size'],
+                'flush_ms': options['flush_ms'],
+                'database': connection.vendor,
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            json.dump(report, stream, ensure_ascii=False, indent=2)
+
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<6} posts/s={row['posts_per_second']:>9.1f} "
+                f"request p50={row['p50_ms']:>8.2f}ms "
+                f"p99={row['p99_ms']:>8.2f}ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Результат сохранён в {options['output']}"))
+
+    def measure(self, mode, authors, data, queue, options):
+        """Опубликовать --posts записей из --clients потоков.
+
+        Время режима queue включает запись хвоста очереди: скорость
+        считается по записям, дошедшим до БД.
+        """
+        before = Post.objects.filter(author__in=authors).count()
+
+        def client(author, count):
+            timings = []
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    form = PostForm(data)
+                    form.is_valid()
+                    post = form.save(commit=False)
+                    post.author = author
+                    if queue is None:
+                        post.save()
+                    else:
+                        queue.put(post)
+                    timings.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            return timings
+
+        clients = len(authors)
+        shares = [options['posts'] // clients
+                  + (i < options['posts'] % clients)
+                  for i in range(clients)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            timings = sorted(
+                timing for timings in pool.map(client, authors, shares)
+                for timing in timings)
+        if queue is not None:
+            queue.stop()
+        elapsed = time.perf_counter() - started
+
+        written = Post.objects.filter(author__in=authors).count() - before
+        row = {'mode': mode, 'posts': written,
+               'seconds': round(elapsed, 3),
+               'posts_per_second': round(written / elapsed, 1)}
+        for percentile in (50, 99):
+            index = min(len(timings) - 1, len(timings) * percentile // 100)
+            row[f'p{percentile}_ms'] = round(timings[index] * 1000, 2)
+        return row
@@ -0,0 +1,38 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.cache import STATS_FIELDS, TieredCache
+
+
+class Command(BaseCommand):
+    help = ('Показывает попадания, промахи и вытеснения двухуровневого '
+            'кеша по воркерам и в сумме')
+
+    def add_arguments(self, parser):
+        parser.add_argument('alias', nargs='?', default='default',
+                            help='alias кеша из CACHES')
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not isinstance(cache, TieredCache):
+            raise CommandError(
+                f'Кеш {options["alias"]} не является TieredCache')
+
+        collected = cache.collect_stats()
+        columns = STATS_FIELDS + ('local_entries', 'local_bytes')
+        total = dict.fromkeys(columns, 0)
+        for worker, stats in collected.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(worker))
+            for column in columns:
+                value = stats.get(column, 0)
+                total[column] += value
+                self.stdout.write(f'  {column}: {value}')
+
+        lookups = total['local_hits'] + total['shared_hits'] + total['misses']
+        hits = total['local_hits'] + total['shared_hits']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Всего (воркеров: {len(collected)})'))
+        for column in columns:
+            self.stdout.write(f'  {column}: {total[column]}')
+        ratio = hits / lookups if lookups else 0
+        self.stdout.write(f'  hit_ratio: {ratio:.1%}')
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import Post
+from posts.paginators import KeysetPaginator
+
+# Признаки сортировки вне индекса в выводе EXPLAIN QUERY PLAN SQLite
+FILESORT_MARKERS = ('USE TEMP B-TREE',)
+
+
+def feed_querysets():
+    """Запросы лент в том виде, в каком их выполняют views.
+
+    Значения фильтров условные: план запроса от них не зависит.
+    """
+    size = settings.PAGINATOR_DEFAULT_SIZE
+    cursor = [timezone.now(), 1]
+    feeds = {
+        'index': Post.objects.feed(),
+        'group': Post.objects.feed().filter(group_id=1),
+        'profile': Post.objects.feed().filter(author_id=1),
+    }
+    for name, queryset in feeds.items():
+        yield f'{name} (numbered)', queryset[size:size * 2]
+        paginator = KeysetPaginator(queryset, size)
+        yield (f'{name} (keyset)',
+               paginator.queryset_after(cursor)[:size + 1])
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN QUERY PLAN для запросов лент index, group '
+            'и profile и проверяет, что сортировка идёт по индексу, без '
+            'временного B-дерева (filesort)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда поддерживает только SQLite')
+
+        failed = []
+        with connection.cursor() as cursor:
+            for name, queryset in feed_querysets():
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = [row[-1] for row in cursor.fetchall()]
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                for detail in plan:
+                    self.stdout.write(f'  {detail}')
+                if any(marker in detail for detail in plan
+                       for marker in FILESORT_MARKERS):
+                    failed.append(name)
+
+        if failed:
+            raise CommandError(
+                'Сортировка вне индекса: ' + ', '.join(failed))
+        self.stdout.write(self.style.SUCCESS(
+            'Все запросы лент сортируются по индексу'))
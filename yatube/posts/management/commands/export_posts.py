@@ -0,0 +1,47 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+from ._posts_io import FIELDS, FORMATS, Progress, detect_format, open_stream
+
+
+class Command(BaseCommand):
+    help = ('Выгружает записи в JSONL или CSV потоком, не держа всю '
+            'выборку в памяти')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help="файл выгрузки, '-' - stdout")
+        parser.add_argument('--format', choices=FORMATS,
+                            help='формат; по умолчанию по расширению файла')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='строк, читаемых из БД за раз')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = detect_format(path, options['format'])
+        rows = (Post.objects.order_by('id')
+                .values_list('text', 'pub_date', 'author__username',
+                             'group__slug')
+                .iterator(chunk_size=options['chunk_size']))
+        progress = Progress(self.stderr, 'Выгружено')
+
+        with open_stream(path, 'w') as stream:
+            if file_format == 'csv':
+                writer = csv.writer(stream)
+                writer.writerow(FIELDS)
+                write = writer.writerow
+            else:
+                def write(row):
+                    stream.write(json.dumps(dict(zip(FIELDS, row)),
+                                            ensure_ascii=False))
+                    stream.write('\n')
+
+            for text, pub_date, author, group in rows:
+                write((text, pub_date.isoformat(), author, group or ''))
+                progress.add(1)
+
+        self.stderr.write(self.style.SUCCESS(progress.summary()))
@@ -0,0 +1,142 @@
+import csv
+import itertools
+import json
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import timelines
+from posts.caching import bump_feed_version
+from posts.models import Group, Post, PostCounter, User
+from posts.signals import post_scopes
+
+from ._posts_io import (FORMATS, Progress, detect_format, insert_posts,
+                        open_stream)
+
+
+def read_jsonl(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'Строка {number}: {error}')
+
+
+class Command(BaseCommand):
+    help = ('Загружает записи из JSONL или CSV потоком, пачками '
+            'в транзакциях; авторы и подборки ищутся по username и slug')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help="файл с записями, '-' - stdin")
+        parser.add_argument('--format', choices=FORMATS,
+                            help='формат; по умолчанию по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='записей в одной транзакции')
+        parser.add_argument('--create-missing', action='store_true',
+                            help='создавать неизвестных авторов и подборки')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = detect_format(path, options['format'])
+        self.create_missing = options['create_missing']
+        self.authors = {}
+        self.groups = {}
+        self.skipped = 0
+        self.touched_scopes = set()
+        progress = Progress(self.stderr, 'Загружено')
+
+        with open_stream(path, 'r') as stream:
+            if file_format == 'csv':
+                records = csv.DictReader(stream)
+            else:
+                records = read_jsonl(stream)
+            posts = filter(None, map(self.build_post, records))
+            while True:
+                batch = list(itertools.islice(posts,
+                                              options['batch_size']))
+                if not batch:
+                    break
+                self.save_batch(batch)
+                progress.add(len(batch))
+
+        # страницы и готовые ленты с новыми записями устарели
+        for scope, object_id in self.touched_scopes:
+            bump_feed_version(scope, object_id)
+            if scope in timelines.TIMELINE_SCOPES.values():
+                timelines.drop(scope, object_id)
+
+        self.stderr.write(self.style.SUCCESS(progress.summary()))
+        if self.skipped:
+            self.stderr.write(self.style.WARNING(
+                f'Пропущено строк: {self.skipped}'))
+
+    def save_batch(self, batch):
+        counters = Counter(
+            scope for post in batch
+            for scope in post_scopes(post.author_id, post.group_id))
+        with transaction.atomic():
+            insert_posts(batch)
+            # вставка не шлёт сигналов: счётчики правим сами
+            for (scope, object_id), delta in counters.items():
+                PostCounter.objects.bump(scope, object_id, delta)
+        self.touched_scopes.update(counters)
+
+    def build_post(self, record):
+        text = record.get('text')
+        author_id = self.lookup(self.authors, record.get('author'),
+                                self.resolve_author)
+        group_slug = record.get('group') or None
+        group_id = (self.lookup(self.groups, group_slug, self.resolve_group)
+                    if group_slug else None)
+        if not text or author_id is None or (group_slug and not group_id):
+            self.skipped += 1
+            return None
+
+        try:
+            pub_date = parse_datetime(record.get('pub_date') or '')
+        except ValueError:
+            # дата в верном формате, но несуществующая: 2021-02-30
+            self.skipped += 1
+            return None
+        if pub_date is None:
+            pub_date = timezone.now()
+        elif timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)
+        post = Post(text=text, pub_date=pub_date, author_id=author_id,
+                    group_id=group_id)
+        # вставка пачкой не вызывает save(), HTML текста готовится здесь
+        post.render_text()
+        return post
+
+    @staticmethod
+    def lookup(cache, key, resolve):
+        """id по ключу с кешем в памяти, включая отрицательные ответы."""
+        if not key:
+            return None
+        if key not in cache:
+            cache[key] = resolve(key)
+        return cache[key]
+
+    def resolve_author(self, username):
+        author_id = (User.objects.filter(username=username)
+                     .values_list('id', flat=True).first())
+        if author_id is None and self.create_missing:
+            author = User(username=username)
+            author.set_unusable_password()
+            author.save()
+            author_id = author.id
+        return author_id
+
+    def resolve_group(self, slug):
+        group_id = (Group.objects.filter(slug=slug)
+                    .values_list('id', flat=True).first())
+        if group_id is None and self.create_missing:
+            group_id = Group.objects.create(
+                title=slug, slug=slug, description=slug).id
+        return group_id
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает готовые ленты авторов и подборок в кеше по '
+            'таблице записей')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scope', action='append',
+                            choices=sorted(timelines.TIMELINE_SCOPES.values()),
+                            help='только ленты этого вида (можно повторять)')
+
+    def handle(self, *args, **options):
+        scopes = options['scope'] or timelines.TIMELINE_SCOPES.values()
+        rebuilt = 0
+        for field, scope in timelines.TIMELINE_SCOPES.items():
+            if scope not in scopes:
+                continue
+            object_ids = (Post.objects.filter(**{f'{field}__isnull': False})
+                          .order_by().values_list(field, flat=True)
+                          .distinct())
+            for object_id in object_ids.iterator():
+                timelines.rebuild(scope, object_id)
+                rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {rebuilt}'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import PostCounter
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики записей (всего, по авторам и по '
+            'подборкам) по таблице записей и исправляет расхождения')
+
+    def handle(self, *args, **options):
+        drift = PostCounter.objects.recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны, исправлено расхождений: {drift}'))
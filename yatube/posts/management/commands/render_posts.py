@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Заполняет text_html записей, у которых он отсутствует или '
+            'устарел (хеш текста не совпадает с text_hash)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--force', action='store_true',
+                            help='перерисовать все записи, например после '
+                                 'смены правил отрисовки')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.only('id', 'text', 'text_hash').order_by('id')
+        updated = checked = 0
+        last_id = 0
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            checked += len(batch)
+            if options['force']:
+                for post in batch:
+                    post.text_hash = ''
+            changed = [post for post in batch if post.render_text()]
+            if changed:
+                with transaction.atomic():
+                    Post.objects.bulk_update(
+                        changed, ('text_html', 'text_hash'))
+                updated += len(changed)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено записей: {checked}, перерисовано: {updated}'))
@@ -0,0 +1,85 @@
+import datetime as dt
+import random
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import Group, Post, PostCounter, User
+
+from ._posts_io import Progress, insert_posts
+
+WORDS = (
+    'кот', 'собака', 'город', 'утро', 'вечер', 'река', 'книга', 'дорога',
+    'солнце', 'дождь', 'музыка', 'код', 'сервер', 'кофе', 'поезд', 'море',
+    'лес', 'снег', 'работа', 'отпуск', 'друг', 'идея', 'фильм', 'сад',
+)
+
+
+class Command(BaseCommand):
+    help = ('Заполняет БД синтетическими авторами, подборками и записями '
+            'для нагрузочных замеров (bench_views)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--span-days', type=int, default=365,
+                            help='за сколько дней распределить pub_date')
+        parser.add_argument('--prefix', default='bench',
+                            help='префикс username и slug тестовых данных')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        prefix = options['prefix']
+        batch_size = options['batch_size']
+
+        User.objects.bulk_create(
+            (User(username=f'{prefix}_user_{i}', password='!',
+                  first_name=f'Имя{i}', last_name=f'Фамилия{i}')
+             for i in range(options['users'])),
+            batch_size=batch_size, ignore_conflicts=True)
+        Group.objects.bulk_create(
+            (Group(title=f'{prefix} подборка {i}', slug=f'{prefix}-group-{i}',
+                   description=f'Синтетическая подборка №{i}')
+             for i in range(options['groups'])),
+            batch_size=batch_size, ignore_conflicts=True)
+        author_ids = list(User.objects.filter(
+            username__startswith=f'{prefix}_user_')
+            .values_list('id', flat=True))
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f'{prefix}-group-')
+            .values_list('id', flat=True))
+
+        total = options['posts']
+        span = dt.timedelta(days=options['span_days'])
+        started = timezone.now() - span
+        step = span / max(total, 1)
+        progress = Progress(self.stderr, 'Создано записей')
+
+        for offset in range(0, total, batch_size):
+            batch = []
+            for i in range(offset, min(offset + batch_size, total)):
+                group_id = (rnd.choice(group_ids)
+                            if group_ids and rnd.random() < 0.7
+                            else None)
+                post = Post(
+                    text=' '.join(rnd.choices(WORDS,
+                                              k=rnd.randint(5, 40))),
+                    pub_date=started + step * i,
+                    author_id=rnd.choice(author_ids),
+                    group_id=group_id,
+                )
+                post.render_text()
+                batch.append(post)
+            with transaction.atomic():
+                insert_posts(batch)
+            progress.add(len(batch))
+
+        # вставка пачками обходит сигналы: счётчики и кеш лент - заново
+        PostCounter.objects.recount()
+        cache.clear()
+        self.stderr.write(self.style.SUCCESS(progress.summary()))
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from yatube.db_router import bump_replica_generation
+
+
+def copy_sqlite(source_alias, path):
+    """Снять согласованную копию SQLite-базы source_alias в файл path.
+
+    Копия собирается во временном файле рядом с path и подменяет его
+    атомарно: открытые соединения реплики дочитывают старый снимок, новые
+    открывают уже свежий.
+    """
+    source = connections[source_alias]
+    source.ensure_connection()
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(
+        dir=directory, prefix='.replica-', suffix='.sqlite3')
+    os.close(descriptor)
+    try:
+        target = sqlite3.connect(temporary)
+        try:
+            source.connection.backup(target)
+            # копия наследует режим WAL основной БД; файл реплики
+            # подменяется целиком, и чужой -wal рядом с ним недопустим
+            target.execute('PRAGMA journal_mode = delete')
+        finally:
+            target.close()
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную SQLite-базу в файлы реплик из '
+            'settings.DATABASE_REPLICAS (локальная замена репликации СУБД)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*',
+                            help='файлы для копии вместо реплик из настроек')
+        parser.add_argument('--every', type=float, default=0,
+                            help='повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('Копирование поддерживается только для '
+                               'SQLite; для других СУБД настройте их '
+                               'собственную репликацию')
+        targets = [(path, None) for path in options['paths']]
+        for alias in settings.DATABASE_REPLICAS:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'Реплика {alias} - не SQLite')
+            targets.append((connections[alias].settings_dict['NAME'], alias))
+        if not options['paths'] and not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте '
+                               'YATUBE_DB_REPLICAS или пути к файлам')
+
+        while True:
+            started = time.monotonic()
+            for path, alias in targets:
+                copy_sqlite(DEFAULT_DB_ALIAS, path)
+                if alias is not None:
+                    # файл реплики заменён: соединение этой команды
+                    # читало бы прежнюю копию. Воркеры открывают
+                    # соединение к реплике в каждом запросе (CONN_MAX_AGE
+                    # реплик - 0) и читают новую копию со следующего
+                    connections[alias].close()
+                self.stdout.write(f'Скопировано в {path}')
+            # страницы, закешированные с прежних копий, больше не
+            # выдаются: ключи и ETag страниц с реплик включают поколение
+            bump_replica_generation()
+            if not options['every']:
+                break
+            time.sleep(max(0, options['every']
+                           - (time.monotonic() - started)))
+        self.stdout.write(self.style.SUCCESS('Реплики синхронизированы'))
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.6 on 2026-10-18 12:30
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostCounter = apps.get_model('posts', 'PostCounter')
+    counters = [PostCounter(scope='all', object_id=0,
+                            value=Post.objects.count())]
+    for field, scope in (('author', 'author'), ('group', 'group')):
+        rows = (Post.objects.filter(**{f'{field}__isnull': False})
+                .order_by().values(field).annotate(value=Count('id')))
+        counters.extend(
+            PostCounter(scope=scope, object_id=row[field], value=row['value'])
+            for row in rows
+        )
+    PostCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('all', 'Все записи'), ('author', 'Записи автора'), ('group', 'Записи подборки')], max_length=10, verbose_name='Область подсчёта')),
+                ('object_id', models.PositiveIntegerField(default=0, verbose_name='Автор или подборка')),
+                ('value', models.IntegerField(default=0, verbose_name='Количество записей')),
+            ],
+            options={
+                'verbose_name': 'Счётчик записей',
+                'verbose_name_plural': 'Счётчики записей',
+                'unique_together': {('scope', 'object_id')},
+            },
+        ),
+        migrations.RunPython(count_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 2.2.6 on 2026-10-18 16:00
+
+import hashlib
+import importlib
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+
+post_fts = importlib.import_module('posts.migrations.0005_post_fts')
+
+# На SQLite AddField пересоздаёт таблицу posts_post, а вместе со старой
+# таблицей удаляются и триггеры полнотекстового индекса из 0005_post_fts
+CREATE_TRIGGERS = tuple(statement for statement in post_fts.CREATE_FTS
+                        if 'CREATE TRIGGER' in statement)
+DROP_TRIGGERS = tuple(statement for statement in post_fts.DROP_FTS
+                      if 'TRIGGER' in statement)
+BATCH_SIZE = 1000
+
+
+def render_existing(apps, schema_editor):
+    """Заполнить text_html и text_hash существующих записей.
+
+    Ленты не загружают text (FEED_FIELDS): запись без text_html
+    дочитывала бы его отдельным запросом. Повторяет Post.render_text -
+    у исторической модели нет её методов.
+    """
+    Post = apps.get_model('posts', 'Post')
+    posts = (Post.objects.filter(text_html='').only('id', 'text')
+             .order_by('id'))
+    last_id = 0
+    while True:
+        batch = list(posts.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for post in batch:
+            post.text_html = str(linebreaksbr(post.text, autoescape=True))
+            post.text_hash = hashlib.sha1(post.text.encode()).hexdigest()
+        Post.objects.bulk_update(batch, ('text_html', 'text_hash'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_fts'),
+    ]
+
+    operations = [
+        # при откате RemoveField тоже пересоздаёт таблицу
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            post_fts.run_on_sqlite(DROP_TRIGGERS + CREATE_TRIGGERS)),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False, verbose_name='Текст записи в HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_hash',
+            field=models.CharField(default='', editable=False, max_length=40, verbose_name='Хеш текста записи'),
+        ),
+        migrations.RunPython(render_existing, migrations.RunPython.noop),
+        migrations.RunPython(
+            post_fts.run_on_sqlite(DROP_TRIGGERS + CREATE_TRIGGERS),
+            migrations.RunPython.noop),
+    ]
@@ -1,9 +1,54 @@
+import hashlib
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Substr
+from django.template.defaultfilters import linebreaksbr
+from django.utils.safestring import mark_safe
 
 User = get_user_model()
 
 
+class GroupQuerySet(models.QuerySet):
+    # Порядок каталога подборок: параметр sort -> поля сортировки
+    DIRECTORY_ORDERINGS = {
+        'activity': (models.F('last_post').desc(nulls_last=True), '-id'),
+        'posts': ('-posts_count', '-id'),
+        'title': ('title',),
+    }
+    DIRECTORY_DEFAULT_SORT = 'activity'
+    # Сколько символов описания показывает каталог
+    SUMMARY_LENGTH = 200
+
+    def directory(self, sort=DIRECTORY_DEFAULT_SORT):
+        """Подборки для каталога со статистикой записей.
+
+        Количество записей берётся из счётчика PostCounter подборки, дата
+        последней записи - поиском по индексу post_group_feed_idx: на
+        подборку два чтения по индексу вместо агрегата по всем записям.
+        Описание выбирается обрезанным.
+
+        аргументы:
+        sort - ключ DIRECTORY_ORDERINGS; неизвестный заменяется порядком
+               по умолчанию
+        """
+        ordering = self.DIRECTORY_ORDERINGS.get(
+            sort, self.DIRECTORY_ORDERINGS[self.DIRECTORY_DEFAULT_SORT])
+        counter = PostCounter.objects.filter(
+            scope=PostCounter.SCOPE_GROUP, object_id=models.OuterRef('pk'))
+        latest = (Post.objects.filter(group=models.OuterRef('pk'))
+                  .order_by('-pub_date'))
+        return (self.only('id', 'title', 'slug')
+                .annotate(
+                    posts_count=Coalesce(
+                        models.Subquery(counter.values('value')[:1]), 0),
+                    last_post=models.Subquery(
+                        latest.values('pub_date')[:1]),
+                    summary=Substr('description', 1,
+                                   self.SUMMARY_LENGTH + 1))
+                .order_by(*ordering))
+
+
 class Group(models.Model):
     title = models.CharField(
         max_length=200, unique=True,
@@ -24,6 +69,8 @@ class Group(models.Model):
         verbose_name='Описание подборки'
     )
 
+    objects = GroupQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Подборка записей'
         verbose_name_plural = 'Подборки записей'
@@ -33,6 +80,28 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    # Поля, которые выводят шаблоны лент: index, group, profile
+    FEED_FIELDS = (
+        'id', 'text_html', 'pub_date',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__slug', 'group__title',
+    )
+
+    def feed(self, *extra_fields):
+        """Набор записей для ленты: авторы и подборки одним JOIN-ом.
+
+        Исключает N+1 запросов при выводе post.author и post.group в
+        шаблоне и не тянет из БД столбцы, которые лента не показывает.
+
+        аргументы:
+        extra_fields - поля сверх FEED_FIELDS, например 'text' для
+                       заголовков RSS/Atom
+        """
+        return (self.select_related('author', 'group')
+                .only(*self.FEED_FIELDS, *extra_fields))
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст записи'
@@ -49,11 +118,169 @@ class Post(models.Model):
         Group, on_delete=models.SET_NULL, blank=True, null=True,
         related_name='posts', verbose_name='Подборка записей'
     )
+    # text, подготовленный для вывода (экранирование и переносы строк),
+    # и хеш текста, из которого он получен
+    text_html = models.TextField(
+        editable=False, default='',
+        verbose_name='Текст записи в HTML'
+    )
+    text_hash = models.CharField(
+        max_length=40, editable=False, default='',
+        verbose_name='Хеш текста записи'
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    # Поля, изменение которых пересчитывает счётчики PostCounter
+    TRACKED_FIELDS = ('author_id', 'group_id')
 
     class Meta:
-        ordering = ('-pub_date',)
+        # id разрешает равенство pub_date, чтобы порядок был однозначным
+        # и совпадал с индексами ниже
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Запись'
         verbose_name_plural = 'Записи'
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_feed_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_feed_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_feed_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # запоминаем загруженные из БД значения, чтобы при сохранении
+        # понять, сменились ли автор или подборка, без лишнего запроса
+        instance._loaded = {
+            field: instance.__dict__[field]
+            for field in cls.TRACKED_FIELDS if field in instance.__dict__
+        }
+        return instance
+
+    @staticmethod
+    def hash_text(text):
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def render_text(self):
+        """Обновить text_html, если text изменился с прошлой отрисовки.
+
+        return - True, если text_html пересчитан
+        """
+        text_hash = self.hash_text(self.text)
+        if text_hash == self.text_hash:
+            return False
+        self.text_html = str(linebreaksbr(self.text, autoescape=True))
+        self.text_hash = text_hash
+        return True
+
+    @property
+    def text_rendered(self):
+        """HTML текста записи для шаблонов."""
+        if not self.text_html:
+            # запись вставлена в обход save() и render_text()
+            return linebreaksbr(self.text, autoescape=True)
+        return mark_safe(self.text_html)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if (self.render_text() and update_fields is not None
+                and 'text' in update_fields):
+            kwargs['update_fields'] = {*update_fields,
+                                       'text_html', 'text_hash'}
+        # счётчики обновляются в post_save в той же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded = {
+            field: getattr(self, field) for field in self.TRACKED_FIELDS
+        }
+
+
+class PostCounterManager(models.Manager):
+    def value(self, scope, object_id=0):
+        """Текущее значение счётчика, 0 если счётчика ещё нет."""
+        return (self.filter(scope=scope, object_id=object_id)
+                .values_list('value', flat=True).first()) or 0
+
+    def bump(self, scope, object_id, delta):
+        """Атомарно изменить счётчик на delta, создав его при отсутствии."""
+        counters = self.filter(scope=scope, object_id=object_id)
+        if counters.update(value=models.F('value') + delta):
+            return
+        try:
+            with transaction.atomic():
+                self.create(scope=scope, object_id=object_id, value=delta)
+        except IntegrityError:
+            # счётчик успел создать параллельный запрос
+            counters.update(value=models.F('value') + delta)
+
+    def recount(self):
+        """Пересчитать все счётчики по таблице Post.
+
+        return - количество счётчиков, значение которых разошлось с БД
+        """
+        with transaction.atomic():
+            actual = {(self.model.SCOPE_ALL, 0): Post.objects.count()}
+            for field, scope in (('author', self.model.SCOPE_AUTHOR),
+                                 ('group', self.model.SCOPE_GROUP)):
+                rows = (Post.objects.filter(**{f'{field}__isnull': False})
+                        .order_by().values(field)
+                        .annotate(value=models.Count('id')))
+                actual.update(((scope, row[field]), row['value'])
+                              for row in rows)
+            stored = {(scope, object_id): value
+                      for scope, object_id, value in self.select_for_update()
+                      .values_list('scope', 'object_id', 'value')}
+            drift = {key for key in stored.keys() | actual.keys()
+                     if stored.get(key, 0) != actual.get(key, 0)}
+            self.all().delete()
+            self.bulk_create(
+                self.model(scope=scope, object_id=object_id, value=value)
+                for (scope, object_id), value in actual.items()
+            )
+        return len(drift)
+
+
+class PostCounter(models.Model):
+    """Поддерживаемое количество записей: всего, у автора, в подборке.
+
+    Обновляется сигналами при создании, удалении записи и смене у неё
+    автора или подборки, так что страницам не нужен COUNT(*) по Post.
+    Расхождение исправляет команда manage.py recount_posts.
+    """
+    SCOPE_ALL = 'all'
+    SCOPE_AUTHOR = 'author'
+    SCOPE_GROUP = 'group'
+    SCOPE_CHOICES = (
+        (SCOPE_ALL, 'Все записи'),
+        (SCOPE_AUTHOR, 'Записи автора'),
+        (SCOPE_GROUP, 'Записи подборки'),
+    )
+
+    scope = models.CharField(
+        max_length=10, choices=SCOPE_CHOICES,
+        verbose_name='Область подсчёта'
+    )
+    object_id = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Автор или подборка'
+    )
+    value = models.IntegerField(
+        default=0,
+        verbose_name='Количество записей'
+    )
+
+    objects = PostCounterManager()
+
+    class Meta:
+        verbose_name = 'Счётчик записей'
+        verbose_name_plural = 'Счётчики записей'
+        unique_together = ('scope', 'object_id')
+
+    def __str__(self):
+        return f'{self.scope}:{self.object_id}={self.value}'
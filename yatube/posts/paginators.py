@@ -0,0 +1,253 @@
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class ElidedPage(Page):
+    """Страница с сокращённым списком номеров для блока пагинации.
+
+    Вместо всех номеров страниц (paginator.page_range) шаблон получает
+    первые и последние on_ends номеров и окно on_each_side номеров вокруг
+    текущей страницы; пропуски обозначаются ELLIPSIS. Длина списка не
+    зависит от общего количества страниц.
+    """
+    is_keyset = False
+
+    @property
+    def elided_page_range(self):
+        return list(self.paginator.get_elided_page_range(self.number))
+
+
+class ElidedPaginator(Paginator):
+    """Paginator, страницы которого знают сокращённый список номеров.
+
+    аргументы:
+    on_each_side - сколько номеров показывать по обе стороны от текущего
+    on_ends - сколько номеров показывать в начале и в конце списка
+    остальные аргументы - как у django.core.paginator.Paginator
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, *args, on_each_side=2, on_ends=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_each_side = int(on_each_side)
+        self.on_ends = int(on_ends)
+
+    def _get_page(self, *args, **kwargs):
+        return ElidedPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number=1):
+        """Номера страниц вокруг number, концы списка и ELLIPSIS между ними."""
+        number = self.validate_number(number)
+        num_pages = self.num_pages
+        window_start = max(number - self.on_each_side, 1)
+        window_end = min(number + self.on_each_side, num_pages)
+
+        if window_start - 1 > self.on_ends + 1:
+            yield from range(1, self.on_ends + 1)
+            yield self.ELLIPSIS
+        else:
+            window_start = 1
+
+        yield from range(window_start, window_end + 1)
+
+        if num_pages - window_end > self.on_ends + 1:
+            yield self.ELLIPSIS
+            yield from range(num_pages - self.on_ends + 1, num_pages + 1)
+        else:
+            yield from range(window_end + 1, num_pages + 1)
+
+
+class EstimatedCountPaginator(ElidedPaginator):
+    """Paginator, который не считает COUNT(*) по большим выборкам.
+
+    Сначала берётся оценка количества объектов (например, поддерживаемый
+    счётчик PostCounter); если она не меньше threshold, она и становится
+    count, а точный COUNT(*) не выполняется. Маленькие выборки считаются
+    точно. При оценке последние страницы могут оказаться пустыми.
+
+    аргументы:
+    estimate - функция без аргументов, возвращающая оценку количества
+    threshold - начиная с какой оценки не считать точное количество
+    остальные аргументы - как у ElidedPaginator
+    """
+
+    def __init__(self, *args, estimate, threshold, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimate = estimate
+        self.threshold = int(threshold)
+        self.is_approximate = False
+
+    @cached_property
+    def count(self):
+        estimated = self.estimate()
+        if estimated >= self.threshold:
+            self.is_approximate = True
+            return estimated
+        return super().count
+
+
+class KeysetPage(Page):
+    """Порция объектов, выбранная по курсору, а не по номеру страницы.
+
+    Повторяет интерфейс django.core.paginator.Page, которым пользуются
+    шаблоны (has_next, has_previous, has_other_pages), но номеров страниц
+    не знает: ссылки "вперёд" и "назад" строятся из курсоров первого и
+    последнего объекта порции.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_cursor(self):
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    def previous_cursor(self):
+        return self.paginator.encode_cursor(self.object_list[0])
+
+    @property
+    def next_page_query(self):
+        return urlencode({'after': self.next_cursor()})
+
+    @property
+    def previous_page_query(self):
+        return urlencode({'before': self.previous_cursor()})
+
+    # номеров у порции нет: шаблон, спросивший номер или позицию,
+    # получает None вместо ошибки и выводит пустое значение
+    def next_page_number(self):
+        return None
+
+    def previous_page_number(self):
+        return None
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class KeysetPaginator:
+    """Пагинатор по ключу сортировки (keyset/cursor pagination).
+
+    Вместо COUNT(*) и OFFSET каждая страница выбирается одним диапазонным
+    запросом по индексу: WHERE (pub_date, id) < (курсор) LIMIT per_page + 1.
+    Стоимость запроса не зависит от глубины страницы.
+
+    аргументы:
+    object_list - QuerySet, который надо разбить постранично
+    per_page - количество объектов на странице
+    ordering - поля ключа сортировки; все поля должны идти в одном
+               направлении, последнее поле должно быть уникальным
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        descending = {field.startswith('-') for field in ordering}
+        if len(descending) != 1:
+            raise ValueError(
+                'Все поля ключа сортировки должны идти в одном направлении')
+        self.descending = descending.pop()
+        self.ordering = tuple(ordering)
+        self.keys = tuple(field.lstrip('-') for field in ordering)
+
+    def encode_cursor(self, obj):
+        values = []
+        for key in self.keys:
+            value = getattr(obj, key)
+            values.append(value.isoformat()
+                          if hasattr(value, 'isoformat') else value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Вернуть значения ключа из курсора или None, если курсор битый."""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, ValueError, TypeError):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            return None
+        opts = self.object_list.model._meta
+        try:
+            return [opts.get_field(key).to_python(value)
+                    for key, value in zip(self.keys, values)]
+        except Exception:
+            return None
+
+    def _seek(self, values, forward):
+        """Условие "строго после курсора" в заданном направлении обхода."""
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            step = Q(**{f'{key}__{lookup}': values[i]})
+            for prev_key, prev_value in zip(self.keys[:i], values[:i]):
+                step &= Q(**{prev_key: prev_value})
+            condition |= step
+        if len(self.keys) > 1:
+            # избыточное условие на первое поле даёт СУБД границу
+            # диапазона для поиска по индексу вместо сканирования с начала
+            bound = Q(**{f'{self.keys[0]}__{lookup}e': values[0]})
+            condition = bound & condition
+        return condition
+
+    def _reversed_ordering(self):
+        return tuple(key if self.descending else f'-{key}'
+                     for key in self.keys)
+
+    def queryset_after(self, values=None):
+        """Упорядоченный QuerySet объектов после значений ключа values."""
+        queryset = self.object_list.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward=True))
+        return queryset
+
+    def get_page(self, after=None, before=None):
+        """Вернуть порцию объектов после курсора after или до before.
+
+        Без валидного курсора возвращается первая страница.
+        """
+        after_values = self.decode_cursor(after)
+        before_values = None if after_values else self.decode_cursor(before)
+
+        if before_values is not None:
+            queryset = (self.object_list
+                        .filter(self._seek(before_values, forward=False))
+                        .order_by(*self._reversed_ordering()))
+            rows = list(queryset[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            if not rows:
+                return self.get_page()
+            return KeysetPage(rows, self, has_next=True,
+                              has_previous=has_previous)
+
+        queryset = self.queryset_after(after_values)
+        rows = list(queryset[:self.per_page + 1])
+        if not rows and after_values is not None:
+            return self.get_page()
+        has_next = len(rows) > self.per_page
+        return KeysetPage(rows[:self.per_page], self, has_next=has_next,
+                          has_previous=after_values is not None)
@@ -0,0 +1,59 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'posts_post_fts'
+# Слова запроса: буквы, цифры и знак подчёркивания в любом алфавите
+WORD_RE = re.compile(r'\w+')
+
+
+def fts_query(text):
+    """Безопасный запрос FTS5 из пользовательской строки.
+
+    Каждое слово берётся в кавычки, чтобы операторы FTS5 (AND, NEAR,
+    звёздочки, скобки) во вводе не ломали разбор запроса. Слова
+    объединяются через AND, последнее ищется по префиксу, как при
+    наборе текста.
+
+    return - строка для MATCH или '' для пустого запроса
+    """
+    words = WORD_RE.findall(text or '')
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def matching_ids(text):
+    """Подзапрос id записей, подходящих под запрос, для filter(id__in=)."""
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (fts_query(text),))
+
+
+def search_posts(queryset, text, ranked=True):
+    """Отфильтровать queryset записей по полнотекстовому запросу text.
+
+    ranked - упорядочить по релевантности (bm25), иначе порядок queryset
+    """
+    if not fts_query(text):
+        return queryset.none()
+    if not fts_available():
+        for word in WORD_RE.findall(text):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    if not ranked:
+        return queryset.filter(id__in=matching_ids(text))
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = posts_post.id',
+               f'{FTS_TABLE} MATCH %s'],
+        params=[fts_query(text)],
+        select={'rank': f'{FTS_TABLE}.rank'},
+    ).order_by('rank', '-pub_date', '-id')
@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import timelines
+from .caching import GROUP_DIRECTORY_SCOPE, bump_feed_version
+from .group_choices import bump_choices_version
+from .models import Group, Post, PostCounter, User
+
+
+def post_scopes(author_id, group_id):
+    """Счётчики, в которые входит запись с такими автором и подборкой."""
+    scopes = [(PostCounter.SCOPE_ALL, 0),
+              (PostCounter.SCOPE_AUTHOR, author_id)]
+    if group_id is not None:
+        scopes.append((PostCounter.SCOPE_GROUP, group_id))
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def remember_loaded_fields(sender, instance, raw, **kwargs):
+    """Дочитать из БД прежних автора и подборку, если они неизвестны."""
+    if raw or instance._state.adding:
+        return
+    loaded = getattr(instance, '_loaded', {})
+    if all(field in loaded for field in Post.TRACKED_FIELDS):
+        return
+    instance._loaded = (Post.objects.filter(pk=instance.pk)
+                        .values(*Post.TRACKED_FIELDS).first() or {})
+
+
+def invalidate_feeds(scopes):
+    """Сбросить закешированные страницы лент, которых касается запись."""
+    def bump():
+        for scope, object_id in scopes:
+            bump_feed_version(scope, object_id)
+    bump()
+    # повторно после фиксации транзакции: страница, закешированная
+    # параллельным запросом до фиксации, не должна пережить изменение
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    new = set(post_scopes(instance.author_id, instance.group_id))
+    if created:
+        old = set()
+    else:
+        loaded = getattr(instance, '_loaded', {})
+        old = set(post_scopes(loaded.get('author_id', instance.author_id),
+                              loaded.get('group_id', instance.group_id)))
+    for scope, object_id in old - new:
+        PostCounter.objects.bump(scope, object_id, -1)
+    for scope, object_id in new - old:
+        PostCounter.objects.bump(scope, object_id, 1)
+    invalidate_feeds(old | new)
+    update_timelines(instance, old, new)
+
+
+def update_timelines(instance, old, new):
+    """Дописать новую запись в готовые ленты или поправить их."""
+    if not settings.POSTS_TIMELINES:
+        return
+    kept = set(timelines.post_timelines(instance.author_id,
+                                        instance.group_id))
+    if not old:
+        # id в ленте должны появиться только вместе с записью в БД
+        transaction.on_commit(lambda: [
+            timelines.push(scope, object_id, instance.pk)
+            for scope, object_id in kept])
+        return
+    for scope, object_id in old - new:
+        timelines.discard(scope, object_id, instance.pk)
+    for scope, object_id in (new - old) & kept:
+        # запись попала в ленту задним числом: место в массиве неизвестно
+        timelines.drop(scope, object_id)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    scopes = post_scopes(instance.author_id, instance.group_id)
+    for scope, object_id in scopes:
+        PostCounter.objects.bump(scope, object_id, -1)
+    invalidate_feeds(scopes)
+    if settings.POSTS_TIMELINES:
+        for scope, object_id in timelines.post_timelines(instance.author_id,
+                                                         instance.group_id):
+            timelines.discard(scope, object_id, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_feeds(sender, instance, created, raw, **kwargs):
+    # каталог выводит все подборки; название и адрес подборки выводятся
+    # ещё и в общей ленте и ленте подборки
+    if raw:
+        return
+    if created:
+        invalidate_feeds([(GROUP_DIRECTORY_SCOPE, 0)])
+    else:
+        invalidate_feeds([(GROUP_DIRECTORY_SCOPE, 0),
+                          (PostCounter.SCOPE_ALL, 0),
+                          (PostCounter.SCOPE_GROUP, instance.pk)])
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_counter(sender, instance, **kwargs):
+    # записи удалённой подборки остаются без подборки (SET_NULL)
+    PostCounter.objects.filter(scope=PostCounter.SCOPE_GROUP,
+                               object_id=instance.pk).delete()
+    invalidate_feeds([(GROUP_DIRECTORY_SCOPE, 0),
+                      (PostCounter.SCOPE_ALL, 0),
+                      (PostCounter.SCOPE_GROUP, instance.pk)])
+    timelines.drop(PostCounter.SCOPE_GROUP, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_choices(sender, instance, **kwargs):
+    # список подборок формы записи собирается заново
+    bump_choices_version()
+
+
+@receiver(post_delete, sender=User)
+def drop_author_counter(sender, instance, **kwargs):
+    PostCounter.objects.filter(scope=PostCounter.SCOPE_AUTHOR,
+                               object_id=instance.pk).delete()
+    timelines.drop(PostCounter.SCOPE_AUTHOR, instance.pk)
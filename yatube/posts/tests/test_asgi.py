@@ -0,0 +1,61 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from yatube.asgi import WsgiToAsgi
+
+
+def wsgi_echo(environ, start_response):
+    """WSGI-приложение, отвечающее частями с данными из environ."""
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    body = environ['wsgi.input'].read()
+    return [environ['PATH_INFO'].encode('latin-1'), b'|',
+            environ['QUERY_STRING'].encode(), b'|',
+            environ['HTTP_X_TEST'].encode(), b'|', b'', body]
+
+
+class YaTbAsgiAdapterTests(SimpleTestCase):
+    def call(self, application, scope, body_parts):
+        messages = [{'type': 'http.request', 'body': part, 'more_body': True}
+                    for part in body_parts[:-1]]
+        messages.append({'type': 'http.request', 'body': body_parts[-1]})
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        return sent
+
+    def test_request_and_streamed_response(self):
+        """environ собирается из scope, ответ отдаётся по частям."""
+        application = WsgiToAsgi(wsgi_echo, max_workers=2)
+        self.addCleanup(application.executor.shutdown)
+        scope = {'type': 'http', 'method': 'POST', 'path': '/путь/',
+                 'query_string': b'q=1',
+                 'headers': [(b'x-test', b'a'), (b'x-test', b'b')]}
+        sent = self.call(application, scope, [b'te', b'lo'])
+
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'content-type', b'text/plain'), sent[0]['headers'])
+        chunks = [message['body'] for message in sent[1:]]
+        self.assertEqual(b''.join(chunks).decode(),
+                         '/путь/|q=1|a,b|telo')
+        # пустые части не отправляются, ответ закрывается пустым телом
+        self.assertNotIn(b'', chunks[:-1])
+        self.assertEqual(sent[-1], {'type': 'http.response.body',
+                                    'body': b''})
+
+    def test_repeated_cookie_headers(self):
+        """Несколько заголовков Cookie склеиваются через '; '."""
+        environ = WsgiToAsgi.build_environ(
+            {'type': 'http', 'method': 'GET', 'path': '/',
+             'headers': [(b'cookie', b'a=1'), (b'cookie', b'b=2'),
+                         (b'x-test', b'a'), (b'x-test', b'b')]},
+            b'')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['HTTP_X_TEST'], 'a,b')
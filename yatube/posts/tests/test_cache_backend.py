@@ -0,0 +1,110 @@
+import tempfile
+import threading
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from yatube.cache import TieredCache
+
+TIERED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tiered': {
+        'BACKEND': 'yatube.cache.TieredCache',
+        'LOCATION': 'tiered-test',
+        'OPTIONS': {
+            'SHARED_ALIAS': 'tiered-shared',
+            'LOCAL_MAX_ENTRIES': 3,
+            'LOCAL_MAX_BYTES': 4096,
+            'LOCAL_TIMEOUT': 60,
+        },
+    },
+    'tiered-shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-shared',
+    },
+}
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class YaTbTieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['tiered']
+        self.shared = caches['tiered-shared']
+        self.cache.clear()
+        for field in self.cache.stats:
+            self.cache.stats[field] = 0
+
+    def test_local_hit_after_set(self):
+        """Записанное значение читается из памяти процесса."""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.stats['local_hits'], 1)
+
+    def test_shared_hit_fills_local_tier(self):
+        """Значение другого воркера читается из общего уровня один раз."""
+        self.shared.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.stats['shared_hits'], 1)
+        self.assertEqual(self.cache.stats['local_hits'], 1)
+
+    def test_lru_evicts_oldest_by_entries_and_bytes(self):
+        """Локальный уровень вытесняет давно не читанные записи."""
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+        self.cache.get('a')
+        self.cache.set('d', 'd')
+        self.assertEqual(self.cache.stats['evictions'], 1)
+        self.assertIsNone(self.cache._local.get(self.cache.make_key('b')))
+        self.cache.set('big', 'x' * 5000)
+        self.assertIsNone(self.cache._local.get(self.cache.make_key('big')))
+        # вытесненное из памяти остаётся в общем уровне
+        self.assertEqual(self.cache.get('b'), 'b')
+
+    def test_incr_is_visible_in_shared_tier(self):
+        """incr меняет значение в общем уровне и сбрасывает локальную копию."""
+        self.cache.set('version', 1)
+        self.cache.get('version')
+        self.assertEqual(self.cache.incr('version'), 2)
+        self.assertEqual(self.shared.get('version'), 2)
+        self.assertEqual(self.cache.get('version'), 2)
+
+    def test_aliases_do_not_share_local_tier(self):
+        """Кеши с разными LOCATION держат раздельные локальные уровни."""
+        other = TieredCache('tiered-other',
+                            TIERED_CACHES['tiered'])
+        self.cache.set('key', 'value')
+        self.assertIsNone(other._local.get(other.make_key('key')))
+        self.assertIsNot(other._local, self.cache._local)
+
+    def test_location_required(self):
+        """Без LOCATION бэкенд не создаётся."""
+        params = dict(TIERED_CACHES['tiered'], LOCATION='')
+        with self.assertRaises(ImproperlyConfigured):
+            TieredCache('', params)
+
+    def test_incr_atomic_over_file_cache(self):
+        """Одновременные incr поверх файлового кеша не теряют приращений."""
+        with tempfile.TemporaryDirectory() as directory:
+            file_caches = dict(TIERED_CACHES, **{'tiered-shared': {
+                'BACKEND': ('django.core.cache.backends.filebased.'
+                            'FileBasedCache'),
+                'LOCATION': directory,
+            }})
+            with override_settings(CACHES=file_caches):
+                cache = caches['tiered']
+                cache.set('version', 0)
+
+                def bump():
+                    for _ in range(20):
+                        caches['tiered'].incr('version')
+
+                threads = [threading.Thread(target=bump) for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(caches['tiered-shared'].get('version'), 80)
@@ -0,0 +1,189 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class YaTbFeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cache_author')
+        cls.group = Group.objects.create(
+            title='Кешируемая подборка', slug='cached',
+            description='Кешируемая подборка')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Исходный текст')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def feed_urls(self):
+        return (
+            reverse('index'),
+            reverse('group', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.author.username}),
+        )
+
+    def test_cached_page_skips_post_query(self):
+        """Повторный показ ленты не выбирает записи из БД."""
+        url = reverse('index')
+        self.guest_client.get(url)
+        # остаются только счётчик записей и COUNT для пагинатора
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(url)
+        self.assertContains(response, 'Исходный текст')
+
+    def test_post_edit_invalidates_feeds(self):
+        """Редактирование записи сбрасывает кеш всех её лент."""
+        for url in self.feed_urls():
+            self.guest_client.get(url)
+        self.author_client.post(
+            reverse('post_edit', kwargs={'username': self.author.username,
+                                         'post_id': self.post.id}),
+            {'text': 'Новый текст', 'group': self.group.id})
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Новый текст')
+                self.assertNotContains(response, 'Исходный текст')
+
+    def test_new_post_invalidates_feeds(self):
+        """Новая запись сразу появляется в закешированных лентах."""
+        for url in self.feed_urls():
+            self.guest_client.get(url)
+        self.author_client.post(reverse('new_post'),
+                                {'text': 'Свежая запись',
+                                 'group': self.group.id})
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url),
+                                    'Свежая запись')
+
+    def test_profile_cache_varies_on_owner(self):
+        """Автор видит ссылки редактирования, гость - нет."""
+        url = reverse('profile', kwargs={'username': self.author.username})
+        edit_url = reverse('post_edit',
+                           kwargs={'username': self.author.username,
+                                   'post_id': self.post.id})
+        self.assertNotContains(self.guest_client.get(url), edit_url)
+        self.assertContains(self.author_client.get(url), edit_url)
+
+
+class YaTbConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag_author')
+        cls.group = Group.objects.create(
+            title='Подборка с ETag', slug='etag', description='ETag')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Текст')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def urls(self):
+        return (
+            reverse('group', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.author.username}),
+            reverse('post', kwargs={'username': self.author.username,
+                                    'post_id': self.post.id}),
+        )
+
+    def test_not_modified_until_post_changes(self):
+        """Повторный запрос с ETag получает 304, пока запись не изменится."""
+        etags = {}
+        for url in self.urls():
+            response = self.guest_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etags[url] = response['ETag']
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 304)
+
+        self.post.text = 'Изменённый текст'
+        self.post.save()
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Гость и автор получают разные ETag одной страницы."""
+        url = reverse('profile', kwargs={'username': self.author.username})
+        guest_etag = self.guest_client.get(url)['ETag']
+        self.guest_client.force_login(self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=guest_etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class YaTbSyndicationFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='feed_author')
+        cls.group = Group.objects.create(
+            title='Подборка с лентой', slug='feed-group',
+            description='Подборка с лентой')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Запись в ленте')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def feed_urls(self):
+        return (
+            reverse('feed'),
+            reverse('feed_atom'),
+            reverse('group_feed', kwargs={'slug': self.group.slug}),
+            reverse('group_feed_atom', kwargs={'slug': self.group.slug}),
+            reverse('profile_feed',
+                    kwargs={'username': self.author.username}),
+            reverse('profile_feed_atom',
+                    kwargs={'username': self.author.username}),
+        )
+
+    def test_feeds_stream_posts_and_honour_etag(self):
+        """Ленты отдают записи потоком и 304, пока записи не менялись."""
+        for url in self.feed_urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response.streaming)
+                body = b''.join(response.streaming_content).decode()
+                self.assertIn('Запись в ленте', body)
+
+                cached = self.guest_client.get(url)
+                self.assertEqual(cached.content.decode(), body)
+
+                not_modified = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(not_modified.status_code, 304)
+
+    def test_feed_does_not_hide_profile(self):
+        """Профиль пользователя feed - страница, а не лента сайта."""
+        user = User.objects.create_user(username='feed')
+        response = self.guest_client.get(
+            reverse('profile', args=[user.username]))
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.context['profile_user'], user)
+
+    def test_new_post_changes_feed_etag(self):
+        """Новая запись меняет ETag ленты подборки."""
+        url = reverse('group_feed', kwargs={'slug': self.group.slug})
+        etag = self.guest_client.get(url)['ETag']
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Ещё одна запись')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
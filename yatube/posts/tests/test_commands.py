@@ -0,0 +1,163 @@
+import datetime as dt
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from posts.models import Group, Post, PostCounter
+
+User = get_user_model()
+
+
+class YaTbImportExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='export_author')
+        cls.group = Group.objects.create(
+            title='Выгружаемая подборка', slug='export',
+            description='Выгружаемая подборка')
+        for i in range(5):
+            Post.objects.create(author=cls.author,
+                                group=cls.group if i % 2 else None,
+                                text='Запись для выгрузки №' + str(i))
+
+    def round_trip(self, extension):
+        """Выгрузить записи, очистить таблицу и загрузить обратно."""
+        expected = list(Post.objects.order_by('id').values_list(
+            'text', 'pub_date', 'author__username', 'group__slug'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.' + extension)
+            call_command('export_posts', path, stderr=io.StringIO())
+            Post.objects.all().delete()
+            call_command('import_posts', path, batch_size=2,
+                         stderr=io.StringIO())
+        imported = list(Post.objects.order_by('id').values_list(
+            'text', 'pub_date', 'author__username', 'group__slug'))
+        self.assertEqual(imported, expected)
+
+    def test_jsonl_round_trip(self):
+        """JSONL: записи, даты публикации, авторы и подборки сохраняются."""
+        self.round_trip('jsonl')
+
+    def test_csv_round_trip_keeps_counters(self):
+        """CSV: после загрузки счётчики записей совпадают с таблицей."""
+        self.round_trip('csv')
+        self.assertEqual(PostCounter.objects.recount(), 0)
+        self.assertEqual(PostCounter.objects.value(
+            PostCounter.SCOPE_GROUP, self.group.id), 2)
+
+    def test_unknown_author_is_skipped(self):
+        """Строки с неизвестным автором пропускаются без --create-missing."""
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl',
+                                         delete=False) as stream:
+            stream.write('{"text": "Текст", "author": "nobody"}\n')
+        try:
+            call_command('import_posts', stream.name, stderr=io.StringIO())
+        finally:
+            os.unlink(stream.name)
+        self.assertFalse(Post.objects.filter(text='Текст').exists())
+
+    def test_impossible_date_is_skipped(self):
+        """Строка с несуществующей датой пропускается, а не роняет загрузку."""
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl',
+                                         delete=False) as stream:
+            stream.write(json.dumps({
+                'text': 'Тридцатое февраля', 'author': 'export_author',
+                'pub_date': '2021-02-30T00:00'}) + '\n')
+            stream.write(json.dumps({
+                'text': 'Первое марта', 'author': 'export_author',
+                'pub_date': '2021-03-01T12:00:00+00:00'}) + '\n')
+        try:
+            call_command('import_posts', stream.name, stderr=io.StringIO())
+        finally:
+            os.unlink(stream.name)
+        self.assertFalse(
+            Post.objects.filter(text='Тридцатое февраля').exists())
+        self.assertEqual(Post.objects.get(text='Первое марта').pub_date,
+                         dt.datetime(2021, 3, 1, 12, tzinfo=dt.timezone.utc))
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+
+class YaTbBenchmarkCommandsTests(TestCase):
+    def test_seed_and_bench_smoke(self):
+        """seed_posts заполняет БД, bench_views сохраняет JSON замеров."""
+        call_command('seed_posts', users=5, groups=2, posts=40,
+                     batch_size=15, stderr=io.StringIO())
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(PostCounter.objects.recount(), 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_views', repeat=1, output=output,
+                         stdout=io.StringIO())
+            call_command('bench_views', repeat=1, output=output,
+                         baseline=output, tolerance=100,
+                         stdout=io.StringIO())
+            with open(output, encoding='utf-8') as stream:
+                report = json.load(stream)
+        views = {row['view'] for row in report['results']}
+        self.assertTrue({'index', 'group', 'profile', 'post'} <= views)
+
+
+class YaTbConcurrencyBenchmarkTests(TransactionTestCase):
+    """Запросы выполняются в других потоках, поэтому данные коммитятся."""
+
+    def test_bench_concurrency_smoke(self):
+        """bench_concurrency прогоняет оба режима и сохраняет JSON."""
+        call_command('seed_posts', users=3, groups=2, posts=20,
+                     stderr=io.StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_concurrency', threads=2, concurrency='1,3',
+                         requests=10, output=output, stdout=io.StringIO())
+            with open(output, encoding='utf-8') as stream:
+                report = json.load(stream)
+        runs = {(row['mode'], row['concurrency'])
+                for row in report['results']}
+        self.assertEqual(runs, {('wsgi', 1), ('asgi', 1),
+                                ('wsgi', 3), ('asgi', 3)})
+
+
+class YaTbSqliteBenchmarkTests(TestCase):
+    def test_bench_sqlite_smoke(self):
+        """bench_sqlite замеряет чтения и записи для обоих профилей."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_sqlite', readers=2, writers=1, duration=0.2,
+                         rows=50, output=output, stdout=io.StringIO())
+            with open(output, encoding='utf-8') as stream:
+                report = json.load(stream)
+        runs = {(row['profile'], row['operation'])
+                for row in report['results']}
+        self.assertEqual(runs, {('default', 'read'), ('default', 'write'),
+                                ('tuned', 'read'), ('tuned', 'write')})
+
+
+class YaTbWriteBenchmarkTests(TransactionTestCase):
+    """Записи публикуются из других потоков, поэтому данные коммитятся.
+
+    Общая тестовая БД в памяти не ждёт блокировок, а сразу отвечает
+    "table is locked": клиент один, и очередь пишется после него.
+    """
+
+    def test_bench_writes_smoke(self):
+        """bench_writes замеряет оба режима и удаляет свои записи."""
+        call_command('seed_posts', users=2, groups=1, posts=5,
+                     stderr=io.StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_writes', clients=1, posts=20, batch_size=50,
+                         flush_ms=60 * 1000, output=output,
+                         stdout=io.StringIO())
+            with open(output, encoding='utf-8') as stream:
+                report = json.load(stream)
+        self.assertEqual({row['mode']: row['posts']
+                          for row in report['results']},
+                         {'direct': 20, 'queue': 20})
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(PostCounter.objects.value(PostCounter.SCOPE_ALL), 5)
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from posts.models import Group, Post, PostCounter
+
+User = get_user_model()
+
+
+class YaTbPostCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='counter_author')
+        cls.group = Group.objects.create(
+            title='Первая подборка', slug='first', description='Первая')
+        cls.other_group = Group.objects.create(
+            title='Вторая подборка', slug='second', description='Вторая')
+
+    def counters(self):
+        value = PostCounter.objects.value
+        return (value(PostCounter.SCOPE_ALL),
+                value(PostCounter.SCOPE_AUTHOR, self.author.id),
+                value(PostCounter.SCOPE_GROUP, self.group.id),
+                value(PostCounter.SCOPE_GROUP, self.other_group.id))
+
+    def test_counters_follow_post_lifecycle(self):
+        """Счётчики меняются при создании, смене подборки и удалении."""
+        post = Post.objects.create(author=self.author, group=self.group,
+                                   text='Запись в первой подборке')
+        Post.objects.create(author=self.author, text='Запись без подборки')
+        self.assertEqual(self.counters(), (2, 2, 1, 0))
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.counters(), (2, 2, 0, 1))
+
+        post.delete()
+        self.assertEqual(self.counters(), (1, 1, 0, 0))
+
+    def test_recount_repairs_drift(self):
+        """recount() приводит счётчики к фактическому числу записей."""
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Запись')
+        PostCounter.objects.filter(scope=PostCounter.SCOPE_ALL).update(
+            value=100)
+        self.assertEqual(PostCounter.objects.recount(), 1)
+        self.assertEqual(self.counters(), (1, 1, 1, 0))
+
+    def test_profile_does_not_count_posts(self):
+        """Страница профиля берёт число записей из счётчика."""
+        Post.objects.create(author=self.author, text='Запись')
+        response = self.client.get(f'/{self.author.username}/')
+        self.assertEqual(response.context['posts_count'], 1)
@@ -0,0 +1,139 @@
+import io
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import OperationalError
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+
+from posts.caching import feed_cache_context, feed_etag
+from posts.models import Post, PostCounter
+from yatube import db_router
+from yatube.db_router import (PIN_COOKIE, ReplicaRouter, RoutingState,
+                              current_routing, replica_generation,
+                              replica_reads)
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class YaTbReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.addCleanup(db_router._unhealthy.clear)
+
+    def route(self, state):
+        token = current_routing.set(state)
+        self.addCleanup(current_routing.reset, token)
+
+    def test_reads_go_to_replica_only_inside_replica_reads(self):
+        """Реплика выбирается только для view, обёрнутых replica_reads."""
+        self.route(RoutingState())
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+        @replica_reads
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Post))
+
+        self.assertEqual(view(None).content, b'replica1')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_pinned_user_reads_primary(self):
+        """Закреплённый после записи пользователь читает основную БД."""
+        self.route(RoutingState(pinned=True))
+
+        @replica_reads
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Post))
+
+        self.assertEqual(view(None).content, b'default')
+
+    def test_failed_replica_falls_back_to_primary(self):
+        """Ошибка реплики повторяет view на основной БД и исключает её."""
+        self.route(RoutingState())
+        calls = []
+
+        @replica_reads
+        def view(request):
+            alias = self.router.db_for_read(Post)
+            calls.append(alias)
+            if alias != 'default':
+                raise OperationalError('no such table: posts_post')
+            return HttpResponse(alias)
+
+        with self.assertLogs('yatube.db', 'WARNING'):
+            self.assertEqual(view(None).content, b'default')
+        self.assertEqual(calls, ['replica1', 'default'])
+
+        # следующий запрос уже не пробует упавшую реплику
+        self.route(RoutingState())
+        calls.clear()
+        view(None)
+        self.assertEqual(calls, ['default'])
+
+    def test_replica_pages_cached_apart_from_primary(self):
+        """Ключ кеша и ETag страницы с реплики зависят от её копии."""
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        page = Paginator([], 10).get_page(1)
+
+        def page_keys(request):
+            return HttpResponse(' '.join((
+                feed_cache_context(request, page,
+                                   PostCounter.SCOPE_ALL)['feed_cache_key'],
+                feed_etag(request, PostCounter.SCOPE_ALL))))
+
+        self.route(RoutingState())
+        primary = page_keys(request).content
+        replica = replica_reads(page_keys)(request).content
+        # страница с отстающей реплики не выдаётся читающим основную БД
+        self.assertNotEqual(replica, primary)
+        self.assertEqual(replica_reads(page_keys)(request).content, replica)
+
+        db_router.bump_replica_generation()
+        self.assertNotEqual(replica_reads(page_keys)(request).content,
+                            replica)
+        self.assertEqual(page_keys(request).content, primary)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class YaTbReplicaPinTests(TestCase):
+    def test_write_pins_user_to_primary(self):
+        """После записи ставится cookie, и ленты читаются с основной БД."""
+        user = User.objects.create(username='replica_writer')
+        client = Client()
+        client.force_login(user)
+        response = client.post(reverse('new_post'), {'text': 'Новая запись'})
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 15)
+        # реплика replica1 не описана в DATABASES: прочитать с неё нельзя
+        response = client.get(reverse('index'))
+        self.assertContains(response, 'Новая запись')
+
+
+class YaTbSyncReplicasTests(TransactionTestCase):
+    """Копия снимается с закоммиченных данных, поэтому без транзакции."""
+
+    def test_copy_to_file(self):
+        """sync_replicas снимает копию основной БД со схемой и данными."""
+        Post.objects.create(author=User.objects.create(username='copied'),
+                            text='Копируемая запись')
+        generation = replica_generation()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            call_command('sync_replicas', path, stdout=io.StringIO())
+            replica = sqlite3.connect(path)
+            try:
+                count, = replica.execute(
+                    'SELECT COUNT(*) FROM posts_post').fetchone()
+            finally:
+                replica.close()
+        self.assertEqual(count, Post.objects.count())
+        # страницы, закешированные с прежней копии, устарели
+        self.assertNotEqual(replica_generation(), generation)
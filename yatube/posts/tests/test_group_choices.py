@@ -0,0 +1,87 @@
+from django import forms
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.forms import PostForm
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class YaTbGroupChoicesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='choices_author')
+        cls.groups = [
+            Group.objects.create(title=title, slug=slug, description=title)
+            for title, slug in (('Коты', 'cats'), ('Котлеты', 'cutlets'),
+                                ('Собаки', 'dogs'))
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_choices_from_cache(self):
+        """Список подборок формы после первого показа не читается из БД."""
+        PostForm().as_p()
+        with self.assertNumQueries(0):
+            form = PostForm()
+            html = form.as_p()
+        self.assertIs(type(form.fields['group']), forms.ModelChoiceField)
+        for group in self.groups:
+            self.assertIn(f'<option value="{group.id}">{group.title}'
+                          '</option>', html)
+
+    def test_invalidated_on_group_save_and_delete(self):
+        """Новая, переименованная и удалённая подборка видны в форме."""
+        PostForm().as_p()
+        Group.objects.create(title='Птицы', slug='birds',
+                             description='Птицы')
+        self.assertIn('Птицы', PostForm().as_p())
+
+        dogs = Group.objects.get(slug='dogs')
+        dogs.title = 'Псы'
+        dogs.save()
+        self.assertIn('Псы', PostForm().as_p())
+        dogs.delete()
+        self.assertNotIn('Псы', PostForm().as_p())
+
+    def test_edit_keeps_selected_group(self):
+        """Форма правки отмечает подборку записи и сохраняет выбор."""
+        post = Post.objects.create(author=self.author, text='Запись',
+                                   group=self.groups[0])
+        url = reverse('post_edit', args=[self.author.username, post.id])
+        self.assertContains(self.client.get(url),
+                            f'<option value="{self.groups[0].id}" '
+                            'selected>')
+        self.client.post(url, {'text': 'Запись',
+                               'group': self.groups[1].id})
+        post.refresh_from_db()
+        self.assertEqual(post.group, self.groups[1])
+
+    def test_lookup_by_prefix(self):
+        """group_lookup ищет по началу названия без учёта регистра."""
+        url = reverse('group_lookup')
+        response = self.client.get(url, {'q': 'кот'})
+        self.assertEqual([group['title'] for group in
+                          response.json()['results']], ['Котлеты', 'Коты'])
+        response = self.client.get(url, {'q': 'Кот', 'limit': 1})
+        self.assertEqual(len(response.json()['results']), 1)
+        response = self.client.get(url, {'q': ''})
+        self.assertEqual(response.json()['results'], [])
+
+    @override_settings(POSTS_GROUP_TYPEAHEAD=True)
+    def test_typeahead_widget(self):
+        """С подсказками форма не выводит список подборок."""
+        response = self.client.get(reverse('new_post'))
+        self.assertNotContains(response, '<option')
+        self.assertContains(response, reverse('group_lookup'))
+        self.client.post(reverse('new_post'),
+                         {'text': 'С подсказкой',
+                          'group': self.groups[2].id})
+        self.assertEqual(Post.objects.get().group, self.groups[2])
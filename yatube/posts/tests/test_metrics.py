@@ -0,0 +1,107 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Engine
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.metrics import RequestMetrics, current_metrics, registry
+
+User = get_user_model()
+
+
+class YaTbRequestMetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='metrics_author')
+        Post.objects.create(author=cls.author, text='Запись для метрик')
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.guest_client = Client()
+
+    def test_server_timing_header(self):
+        """Ответ содержит Server-Timing с БД и шаблонами."""
+        response = self.guest_client.get(reverse('index'))
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="3 queries"', timing)
+        self.assertIn('tpl;dur=', timing)
+
+    def test_percentiles_per_view(self):
+        """Перцентили копятся отдельно по каждому view."""
+        for _ in range(3):
+            self.guest_client.get(reverse('index'))
+        self.guest_client.get(
+            reverse('profile', kwargs={'username': self.author.username}))
+        summary = registry.summary()
+        self.assertEqual(summary['index']['count'], 3)
+        self.assertEqual(summary['profile']['count'], 1)
+        # первый показ выбирает записи, следующие берут их из кеша
+        self.assertEqual(summary['index']['db_queries_p99'], 3)
+        self.assertEqual(summary['index']['db_queries_p50'], 2)
+        self.assertGreater(summary['index']['template_ms_p99'], 0)
+
+
+class YaTbTemplateLoaderTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.write('child.html',
+                   '{% extends "parent.html" %}'
+                   '{% block b %}ребёнок{% endblock %}')
+        self.write('parent.html',
+                   '{% block b %}{% endblock %}|{% include "part.html" %}')
+        self.write('part.html', 'часть')
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        # mtime должен отличаться и на ФС с грубой точностью времени
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + len(content)))
+
+    def engine(self, check_mtime, profile):
+        return Engine(
+            dirs=[self.directory.name],
+            loaders=[('yatube.template_loaders.Loader',
+                      ['django.template.loaders.filesystem.Loader'],
+                      check_mtime, profile)],
+        )
+
+    def test_changed_file_is_reloaded(self):
+        """При check_mtime изменённый файл перечитывается без перезапуска."""
+        engine = self.engine(check_mtime=True, profile=False)
+
+        def render():
+            return engine.get_template('child.html').render(Context())
+
+        self.assertEqual(render(), 'ребёнок|часть')
+        self.write('part.html', 'новая часть')
+        self.assertEqual(render(), 'ребёнок|новая часть')
+
+    def test_cached_without_mtime_check(self):
+        """Без check_mtime шаблон разбирается один раз."""
+        engine = self.engine(check_mtime=False, profile=False)
+        first = engine.get_template('part.html')
+        self.write('part.html', 'новая часть')
+        self.assertIs(engine.get_template('part.html'), first)
+
+    def test_profile_records_every_template(self):
+        """Профилирование видит шаблон, его родителя и include."""
+        engine = self.engine(check_mtime=False, profile=True)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            engine.get_template('child.html').render(Context())
+        finally:
+            current_metrics.reset(token)
+        self.assertEqual(set(metrics.templates),
+                         {'child.html', 'parent.html', 'part.html'})
@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.paginators import (ElidedPaginator, EstimatedCountPaginator,
+                              KeysetPaginator)
+
+User = get_user_model()
+
+
+class YaTbKeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.PER_PAGE = 10
+        cls.author = User.objects.create(username='keyset_author')
+        for i in range(cls.PER_PAGE * 2 + 3):
+            Post.objects.create(author=cls.author, text='Пост №' + str(i))
+        cls.expected_ids = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True))
+
+    def test_walk_forward_and_back(self):
+        """Обход вперёд по курсорам и обратно даёт все посты без пропусков."""
+        paginator = KeysetPaginator(Post.objects.all(), self.PER_PAGE)
+        page = paginator.get_page()
+        self.assertFalse(page.has_previous())
+        pages = [page]
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor())
+            self.assertTrue(page.has_previous())
+            pages.append(page)
+        seen = [post.id for page in pages for post in page]
+        self.assertEqual(seen, self.expected_ids)
+
+        back = paginator.get_page(before=pages[-1].previous_cursor())
+        self.assertEqual([post.id for post in back],
+                         [post.id for post in pages[-2]])
+        self.assertTrue(back.has_next())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор не ломает страницу, а отдаёт первую порцию."""
+        paginator = KeysetPaginator(Post.objects.all(), self.PER_PAGE)
+        page = paginator.get_page(after='not-a-cursor')
+        self.assertEqual([post.id for post in page],
+                         self.expected_ids[:self.PER_PAGE])
+
+    @override_settings(PAGINATOR_MODE='keyset')
+    def test_index_keyset_mode(self):
+        """В режиме keyset страница index не считает посты и не сдвигает."""
+        client = Client()
+        response = client.get(reverse('index'))
+        page = response.context['page']
+        self.assertTrue(page.is_keyset)
+        self.assertContains(response, '?' + page.next_page_query)
+
+        with self.assertNumQueries(1):
+            KeysetPaginator(Post.objects.all(), self.PER_PAGE).get_page(
+                after=page.next_cursor()).object_list
+
+    def test_page_numbers_safe_in_templates(self):
+        """Номера и позиции порции не роняют шаблон, а выводятся пустыми."""
+        page = KeysetPaginator(Post.objects.all(), self.PER_PAGE).get_page()
+        self.assertIsNone(page.next_page_number())
+        self.assertIsNone(page.previous_page_number())
+        self.assertIsNone(page.start_index())
+        self.assertIsNone(page.end_index())
+        template = Template(
+            '{{ page.next_page_number|default_if_none:"" }}'
+            '{{ page.previous_page_number|default_if_none:"" }}'
+            '{{ page.start_index|default_if_none:"" }}'
+            '{{ page.end_index|default_if_none:"" }}')
+        self.assertEqual(template.render(Context({'page': page})), '')
+
+
+class YaTbElidedPaginatorTests(TestCase):
+    def elided(self, number, num_pages):
+        paginator = ElidedPaginator(range(num_pages), 1,
+                                    on_each_side=2, on_ends=1)
+        return list(paginator.get_elided_page_range(number))
+
+    def test_elided_page_range(self):
+        """Сокращённый список: концы, окно вокруг текущей и пропуски."""
+        E = ElidedPaginator.ELLIPSIS
+        self.assertEqual(self.elided(1, 5), [1, 2, 3, 4, 5])
+        self.assertEqual(self.elided(1, 100000), [1, 2, 3, E, 100000])
+        self.assertEqual(self.elided(500, 100000),
+                         [1, E, 498, 499, 500, 501, 502, E, 100000])
+        self.assertEqual(self.elided(100000, 100000),
+                         [1, E, 99998, 99999, 100000])
+        # пропуск одного номера не заменяется многоточием
+        self.assertEqual(self.elided(5, 9), list(range(1, 10)))
+
+    @override_settings(PAGINATOR_DEFAULT_SIZE=1)
+    def test_index_renders_window_only(self):
+        """Блок пагинации index не перечисляет все страницы."""
+        author = User.objects.create(username='elided_author')
+        for i in range(30):
+            Post.objects.create(author=author, text='Пост №' + str(i))
+        response = Client().get(reverse('index'), {'page': 15})
+        self.assertContains(response, 'page=14')
+        self.assertContains(response, 'page=30')
+        self.assertNotContains(response, 'page=5"')
+        self.assertContains(response, ElidedPaginator.ELLIPSIS)
+
+
+class YaTbEstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create(username='estimate_author')
+        for i in range(5):
+            Post.objects.create(author=author, text='Пост №' + str(i))
+
+    def test_estimate_above_threshold(self):
+        """Оценка выше порога заменяет COUNT(*)."""
+        paginator = EstimatedCountPaginator(
+            Post.objects.all(), 2, estimate=lambda: 1000, threshold=100)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.num_pages, 500)
+        self.assertTrue(paginator.is_approximate)
+
+    def test_exact_count_below_threshold(self):
+        """Ниже порога количество считается точно."""
+        paginator = EstimatedCountPaginator(
+            Post.objects.all(), 2, estimate=lambda: 7, threshold=100)
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.is_approximate)
+
+    @override_settings(PAGINATOR_DEFAULT_SIZE=2,
+                       PAGINATOR_ESTIMATE_THRESHOLD=1)
+    def test_index_shows_approximate_pages(self):
+        """На index выводится примерное количество страниц."""
+        response = Client().get(reverse('index'))
+        self.assertTrue(response.context['page'].paginator.is_approximate)
+        self.assertContains(response, 'около 3 стр.')
@@ -0,0 +1,196 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class YaTbFeedQueryBudgetTests(TestCase):
+    """Количество запросов к БД на страницу ленты не зависит от её размера.
+
+    Бюджет запросов:
+    index   - счётчик записей + COUNT для пагинатора + выборка порции постов
+    group   - id подборки для ETag + подборка + счётчик записей подборки
+              + COUNT + выборка порции постов
+    profile - id автора для ETag + автор + счётчик записей автора
+              + COUNT + выборка порции постов
+
+    COUNT выполняется, пока счётчик ниже PAGINATOR_ESTIMATE_THRESHOLD.
+    """
+    FEED_BUDGETS = {
+        'index': 3,
+        'group': 5,
+        'profile': 5,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Подборка для подсчёта запросов',
+            slug='query-budget',
+            description='Подборка для подсчёта запросов',
+        )
+        cls.author = User.objects.create(username='budget_author')
+        for i in range(15):
+            # каждый пост от отдельного автора, чтобы N+1 был заметен
+            author = (cls.author if i % 2 else
+                      User.objects.create(username='budget_user' + str(i)))
+            Post.objects.create(author=author, group=cls.group,
+                                text='Текст поста №' + str(i))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def feed_urls(self):
+        return {
+            'index': reverse('index'),
+            'group': reverse('group', kwargs={'slug': self.group.slug}),
+            'profile': reverse('profile',
+                               kwargs={'username': self.author.username}),
+        }
+
+    def test_feed_query_budget_for_any_page_size(self):
+        """Ленты укладываются в фиксированный бюджет запросов."""
+        for page_size in (1, 5, 10):
+            for name, url in self.feed_urls().items():
+                with self.subTest(page_size=page_size, feed=name):
+                    with override_settings(PAGINATOR_DEFAULT_SIZE=page_size):
+                        with self.assertNumQueries(self.FEED_BUDGETS[name]):
+                            response = self.guest_client.get(url)
+                    self.assertEqual(response.status_code, 200)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=1)
+    def test_large_feeds_skip_count(self):
+        """Выше порога ленты обходятся без COUNT(*) по записям."""
+        for name, url in self.feed_urls().items():
+            with self.subTest(feed=name):
+                with self.assertNumQueries(self.FEED_BUDGETS[name] - 1):
+                    response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class YaTbGroupDirectoryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create(username='directory_author')
+        cls.quiet = Group.objects.create(title='Тихая', slug='quiet',
+                                         description='Без записей')
+        cls.busy = Group.objects.create(title='Шумная', slug='busy',
+                                        description='Ж' * 500)
+        cls.old = Group.objects.create(title='Давняя', slug='old',
+                                       description='Одна запись')
+        Post.objects.create(author=author, group=cls.old, text='Давно')
+        for i in range(3):
+            Post.objects.create(author=author, group=cls.busy,
+                                text='Запись №' + str(i))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def directory(self, sort):
+        return self.guest_client.get(reverse('group_index'), {'sort': sort})
+
+    def test_stats_in_fixed_queries(self):
+        """Статистика подборок: COUNT подборок и один запрос без агрегатов."""
+        with self.assertNumQueries(2):
+            response = self.directory('activity')
+        groups = list(response.context['page'])
+        self.assertEqual([group.slug for group in groups],
+                         ['busy', 'old', 'quiet'])
+        self.assertEqual([group.posts_count for group in groups], [3, 1, 0])
+        self.assertNotContains(response, 'Ж' * 201)
+
+    def test_sorts(self):
+        """Каталог сортируется по числу записей и по названию."""
+        for sort, expected in (('posts', ['busy', 'old', 'quiet']),
+                               ('title', ['old', 'quiet', 'busy']),
+                               ('unknown', ['busy', 'old', 'quiet'])):
+            with self.subTest(sort=sort):
+                page = self.directory(sort).context['page']
+                self.assertEqual([group.slug for group in page], expected)
+
+    def test_cached_until_groups_change(self):
+        """Каталог кешируется по своей версии: записи его не сбрасывают."""
+        cached = self.directory('activity').content
+        Post.objects.create(author=User.objects.get(),
+                            group=self.quiet, text='Первая')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.directory('activity').content, cached)
+
+        Group.objects.create(title='Новая', slug='new',
+                             description='Новая подборка')
+        response = self.directory('activity')
+        self.assertEqual([group.slug for group in response.context['page']],
+                         ['quiet', 'busy', 'old', 'new'])
+
+    @override_settings(GROUP_DIRECTORY_CACHE_TIMEOUT=0)
+    def test_cache_timeout(self):
+        """Страница каталога живёт GROUP_DIRECTORY_CACHE_TIMEOUT секунд."""
+        self.directory('activity')
+        with self.assertNumQueries(2):
+            self.directory('activity')
+
+
+class YaTbPostDetailQueryTests(TestCase):
+    """Запись, её автор и подборка выбираются одним запросом.
+
+    Бюджет запросов:
+    post_view (гость)  - запись с автором и подборкой + счётчик автора;
+                         ETag строится по той же записи
+    post_view (автор)  - сессия + пользователь + запись + счётчик
+    post_edit (автор)  - сессия + пользователь + запись; список подборок
+                         для формы берётся из кеша
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='detail_author')
+        cls.group = Group.objects.create(title='Детали', slug='details',
+                                         description='Подборка записи')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Запись для подсчёта запросов')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.post_url = reverse('post', args=[self.author.username,
+                                              self.post.id])
+        self.edit_url = reverse('post_edit', args=[self.author.username,
+                                                   self.post.id])
+
+    def test_post_view_queries(self):
+        """Страница записи не дочитывает автора и пользователя."""
+        with self.assertNumQueries(2):
+            response = Client().get(self.post_url)
+        self.assertContains(response, 'Запись для подсчёта запросов')
+
+        with self.assertNumQueries(4):
+            response = self.author_client.get(self.post_url)
+        self.assertContains(response, 'Редактировать')
+        # автор записи - тот же объект, что и request.user
+        self.assertIs(response.context['post'].author,
+                      response.context['user'])
+
+    def test_post_edit_queries(self):
+        """Форма правки не загружает автора второй раз."""
+        # первый показ формы кеширует список подборок
+        self.author_client.get(self.edit_url)
+        with self.assertNumQueries(3):
+            response = self.author_client.get(self.edit_url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_wrong_author_is_404(self):
+        """Запись под чужим именем автора не находится."""
+        User.objects.create(username='someone_else')
+        url = reverse('post', args=['someone_else', self.post.id])
+        response = Client().get(url)
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import fts_query, search_posts
+
+User = get_user_model()
+
+
+class YaTbSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='search_author')
+        cls.cats = Post.objects.create(
+            author=cls.author, text='Коты любят спать на солнце')
+        cls.dogs = Post.objects.create(
+            author=cls.author, text='Собаки любят гулять')
+        cls.both = Post.objects.create(
+            author=cls.author, text='Коты и собаки, коты и снова коты')
+
+    def found(self, text):
+        return set(search_posts(Post.objects.all(), text))
+
+    def test_fts_query_escapes_operators(self):
+        """Операторы FTS5 во вводе не ломают запрос."""
+        self.assertEqual(fts_query('коты NEAR("x" *'), '"коты" "NEAR" "x"*')
+        self.assertEqual(fts_query('  '), '')
+
+    def test_search_follows_inserts_updates_deletes(self):
+        """Индекс следует за созданием, изменением и удалением записей."""
+        self.assertEqual(self.found('коты'), {self.cats, self.both})
+        self.assertEqual(self.found('люб'), {self.cats, self.dogs})
+
+        dogs = Post.objects.get(pk=self.dogs.pk)
+        dogs.text = 'Собаки и коты'
+        dogs.save()
+        self.assertEqual(self.found('коты'),
+                         {self.cats, self.dogs, self.both})
+        self.assertEqual(self.found('гулять'), set())
+
+        Post.objects.filter(pk=self.cats.pk).delete()
+        self.assertEqual(self.found('солнце'), set())
+
+    def test_search_view_ranks_results(self):
+        """Страница поиска выводит самые релевантные записи первыми."""
+        response = Client().get(reverse('search'), {'q': 'коты'})
+        posts = list(response.context['page'].object_list)
+        self.assertEqual(posts[0], self.both)
+        self.assertEqual(set(posts), {self.cats, self.both})
+
+    def test_search_does_not_hide_profile(self):
+        """Профиль пользователя search открывается по своему адресу."""
+        user = User.objects.create(username='search')
+        response = Client().get(reverse('profile', args=[user.username]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['profile_user'], user)
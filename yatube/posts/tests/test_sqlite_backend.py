@@ -0,0 +1,41 @@
+import sqlite3
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Group
+from yatube.db_backends.sqlite3.base import apply_pragmas
+
+
+class YaTbSqliteBackendTests(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        """Новое соединение получает PRAGMA из OPTIONS['pragmas']."""
+        pragmas = connection.settings_dict['OPTIONS']['pragmas']
+        with connection.cursor() as cursor:
+            for name in ('cache_size', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], pragmas[name])
+
+
+class YaTbSqliteTransactionModeTests(TransactionTestCase):
+    def test_transactions_take_write_lock(self):
+        """atomic() начинает транзакцию с BEGIN IMMEDIATE."""
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Group.objects.exists()
+        self.assertEqual(queries.captured_queries[0]['sql'],
+                         'BEGIN IMMEDIATE')
+
+
+class YaTbApplyPragmasTests(SimpleTestCase):
+    def test_rejects_unsafe_values(self):
+        """В PRAGMA не подставляется ничего, кроме имён и чисел."""
+        raw = sqlite3.connect(':memory:')
+        self.addCleanup(raw.close)
+        apply_pragmas(raw, {'cache_size': -2000, 'journal_mode': 'memory'})
+        self.assertEqual(raw.execute('PRAGMA cache_size').fetchone()[0],
+                         -2000)
+        with self.assertRaises(ImproperlyConfigured):
+            apply_pragmas(raw, {'cache_size': '1; DROP TABLE x'})
@@ -0,0 +1,82 @@
+import importlib
+import io
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+text_html_migration = importlib.import_module(
+    'posts.migrations.0006_post_text_html')
+
+
+class YaTbPostTextHtmlTests(TestCase):
+    TEXT = 'Первая строка <b>\nвторая строка'
+    HTML = 'Первая строка &lt;b&gt;<br>вторая строка'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='html_author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rendered_on_save(self):
+        """HTML текста готовится при сохранении и обновляется с текстом."""
+        post = Post.objects.create(author=self.author, text=self.TEXT)
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, self.HTML)
+        self.assertEqual(post.text_hash, Post.hash_text(self.TEXT))
+
+        post.text = 'Новый текст'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'Новый текст')
+
+    def test_feeds_use_precomputed_html(self):
+        """Ленты выводят готовый HTML и не выбирают исходный текст."""
+        Post.objects.create(author=self.author, text=self.TEXT)
+        post = Post.objects.feed().get()
+        self.assertIn('text', post.get_deferred_fields())
+        response = Client().get(reverse('index'))
+        self.assertContains(response, self.HTML, html=False)
+
+    def test_backfill_command(self):
+        """render_posts заполняет HTML у записей, созданных до него."""
+        post = Post.objects.create(author=self.author, text=self.TEXT)
+        Post.objects.filter(pk=post.pk).update(text_html='', text_hash='')
+        # до заполнения текст отрисовывается на лету
+        stale = Post.objects.get(pk=post.pk)
+        self.assertEqual(stale.text_rendered, self.HTML)
+
+        out = io.StringIO()
+        call_command('render_posts', stdout=out)
+        self.assertIn('перерисовано: 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, self.HTML)
+
+        out = io.StringIO()
+        call_command('render_posts', stdout=out)
+        self.assertIn('перерисовано: 0', out.getvalue())
+
+    def test_migration_backfills_existing_posts(self):
+        """Миграция заполняет HTML: лента не дочитывает текст по записи."""
+        for _ in range(3):
+            Post.objects.create(author=self.author, text=self.TEXT)
+        Post.objects.update(text_html='', text_hash='')
+        text_html_migration.render_existing(apps, None)
+        self.assertFalse(Post.objects.filter(text_html='').exists())
+        self.assertEqual(Post.objects.first().text_hash,
+                         Post.hash_text(self.TEXT))
+
+        posts = list(Post.objects.feed())
+        with self.assertNumQueries(0):
+            for post in posts:
+                self.assertEqual(post.text_rendered, self.HTML)
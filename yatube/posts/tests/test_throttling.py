@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube import throttling
+from yatube.metrics import registry
+from yatube.throttling import refill
+
+User = get_user_model()
+
+
+class YaTbTokenBucketTests(SimpleTestCase):
+    def test_bucket_refills_over_period(self):
+        """Корзина тратит токены и наполняется равномерно за period."""
+        state = None
+        for _ in range(3):
+            state, wait = refill(state, 3, 60, now=0)
+            self.assertEqual(wait, 0)
+
+        state, wait = refill(state, 3, 60, now=0)
+        self.assertEqual(wait, 20)
+        # через 20 секунд появляется один токен
+        state, wait = refill(state, 3, 60, now=20)
+        self.assertEqual(wait, 0)
+        # за простой корзина не переполняется
+        state, _ = refill(state, 3, 60, now=1000)
+        self.assertEqual(state, (2, 1000))
+
+
+@override_settings(THROTTLE_RATES={
+    'posts_write': {'user': (2, 60), 'ip': (3, 60)},
+})
+class YaTbWriteThrottleTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='throttled_author')
+        cls.other = User.objects.create(username='throttled_other')
+
+    def setUp(self):
+        cache.clear()
+        throttling.local_buckets.clear()
+        registry.reset()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def publish(self, client, text='Запись'):
+        return client.post(reverse('new_post'), {'text': text})
+
+    def test_user_limit_returns_429(self):
+        """Лишняя запись пользователя получает 429 и Retry-After."""
+        for _ in range(2):
+            self.assertEqual(self.publish(self.client).status_code, 302)
+
+        response = self.publish(self.client)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_ip_limit_shared_by_users(self):
+        """Корзина IP общая для всех пользователей с этого адреса."""
+        other_client = Client()
+        other_client.force_login(self.other)
+        self.publish(self.client)
+        self.publish(self.client)
+        self.assertEqual(self.publish(other_client).status_code, 302)
+        self.assertEqual(self.publish(other_client).status_code, 429)
+
+    def test_rejected_requests_keep_ip_tokens(self):
+        """Отклонённые запросы пользователя не тратят токены корзины IP."""
+        for _ in range(2):
+            self.publish(self.client)
+        for _ in range(3):
+            self.assertEqual(self.publish(self.client).status_code, 429)
+        other_client = Client()
+        other_client.force_login(self.other)
+        self.assertEqual(self.publish(other_client).status_code, 302)
+
+    def test_edit_is_throttled_and_form_is_not(self):
+        """Правка тратит токены, открытие формы - нет."""
+        post = Post.objects.create(author=self.user, text='Исходный текст')
+        url = reverse('post_edit', args=[self.user.username, post.id])
+        for _ in range(5):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for _ in range(2):
+            self.client.post(url, {'text': 'Новый текст'})
+        self.assertEqual(
+            self.client.post(url, {'text': 'Ещё текст'}).status_code, 429)
+
+    def test_throttled_requests_in_metrics(self):
+        """Отклонённые запросы считаются в сводке метрик по view."""
+        for _ in range(4):
+            self.publish(self.client)
+        self.assertEqual(registry.summary()['new_post']['throttled'], 2)
+
+    def test_memory_fallback_without_cache(self):
+        """Без кеша корзины хранятся в памяти процесса."""
+        with mock.patch.object(throttling.cache, 'get',
+                               side_effect=OSError('cache is down')), \
+                self.assertLogs('yatube.throttle', 'WARNING'):
+            for _ in range(2):
+                self.assertEqual(self.publish(self.client).status_code,
+                                 302)
+            self.assertEqual(self.publish(self.client).status_code, 429)
@@ -0,0 +1,138 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts import timelines
+from posts.models import Group, Post, PostCounter
+from yatube.db_router import RoutingState, current_routing, replica_reads
+
+User = get_user_model()
+
+
+@override_settings(POSTS_TIMELINES=True, PAGINATOR_DEFAULT_SIZE=3)
+class YaTbTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='timeline_author')
+        cls.group = Group.objects.create(title='Лента', slug='timeline',
+                                         description='Готовая лента')
+        for i in range(7):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text='Запись №' + str(i))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def expected_ids(self, **filters):
+        return list(Post.objects.filter(**filters)
+                    .values_list('id', flat=True))
+
+    def test_moved_and_deleted_posts(self):
+        """Перенос и удаление записи поправляют готовые ленты."""
+        other = Group.objects.create(title='Другая', slug='other',
+                                     description='Другая подборка')
+        post = Post.objects.filter(group=self.group).last()
+        timelines.read(PostCounter.SCOPE_GROUP, self.group.id)
+        timelines.read(PostCounter.SCOPE_GROUP, other.id)
+        post.group = other
+        post.save()
+        self.assertNotIn(post.id,
+                         timelines.read(PostCounter.SCOPE_GROUP,
+                                        self.group.id))
+        self.assertEqual(list(timelines.read(PostCounter.SCOPE_GROUP,
+                                             other.id)), [post.id])
+        post.delete()
+        self.assertEqual(len(timelines.read(PostCounter.SCOPE_GROUP,
+                                            other.id)), 0)
+
+    def test_profile_pages_from_timeline(self):
+        """Страницы профиля выбираются по готовым id без COUNT(*)."""
+        url = reverse('profile', kwargs={'username': self.author.username})
+        expected = self.expected_ids(author=self.author)
+        self.client.get(url)
+        seen = []
+        for number in (1, 2, 3):
+            response = self.client.get(url, {'page': number})
+            seen += [post.id for post in response.context['page']]
+            self.assertEqual(response.context['page'].paginator.count,
+                             len(expected))
+        self.assertEqual(seen, expected)
+
+    @override_settings(TIMELINE_SIZE=4)
+    def test_pages_beyond_timeline_use_queryset(self):
+        """За пределами массива id записи выбираются обычным запросом."""
+        url = reverse('group', kwargs={'slug': self.group.slug})
+        expected = self.expected_ids(group=self.group)
+        seen = []
+        for number in (1, 2, 3):
+            response = self.client.get(url, {'page': number})
+            seen += [post.id for post in response.context['page']]
+        self.assertEqual(seen, expected)
+
+    def test_rebuild_command(self):
+        """rebuild_timelines восстанавливает ленты по таблице записей."""
+        cache.clear()
+        call_command('rebuild_timelines', stdout=io.StringIO())
+        with self.assertNumQueries(0):
+            ids = timelines.read(PostCounter.SCOPE_GROUP, self.group.id)
+        self.assertEqual(list(ids), self.expected_ids(group=self.group))
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_rebuilt_from_primary(self):
+        """Лента собирается из основной БД и на странице с реплики."""
+        token = current_routing.set(RoutingState())
+        self.addCleanup(current_routing.reset, token)
+
+        # replica1 не описана в DATABASES: чтение с неё упало бы
+        @replica_reads
+        def view(request):
+            return timelines.read(PostCounter.SCOPE_GROUP, self.group.id)
+
+        self.assertEqual(list(view(None)),
+                         self.expected_ids(group=self.group))
+
+    @override_settings(TIMELINE_TIMEOUT=60)
+    def test_timeout_not_extended_by_push(self):
+        """Дописывание в массив не продлевает срок его жизни."""
+        key = timelines._key(PostCounter.SCOPE_AUTHOR, self.author.id)
+        timelines.read(PostCounter.SCOPE_AUTHOR, self.author.id)
+        expires, _ = cache.get(key)
+        timelines.push(PostCounter.SCOPE_AUTHOR, self.author.id, 10 ** 6)
+        self.assertEqual(cache.get(key)[0], expires)
+        self.assertEqual(timelines.read(PostCounter.SCOPE_AUTHOR,
+                                        self.author.id)[0], 10 ** 6)
+
+
+@override_settings(POSTS_TIMELINES=True)
+class YaTbTimelinePushTests(TransactionTestCase):
+    """id попадает в ленты после фиксации транзакции, поэтому без неё."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_new_post_is_pushed(self):
+        """Новая запись дописывается в начало собранных лент."""
+        author = User.objects.create(username='push_author')
+        group = Group.objects.create(title='Лента', slug='push',
+                                     description='Готовая лента')
+        Post.objects.create(author=author, group=group, text='Старая запись')
+        scopes = ((PostCounter.SCOPE_AUTHOR, author.id),
+                  (PostCounter.SCOPE_GROUP, group.id))
+        for scope, object_id in scopes:
+            timelines.read(scope, object_id)
+
+        post = Post.objects.create(author=author, group=group,
+                                   text='Свежая запись')
+        for scope, object_id in scopes:
+            with self.subTest(scope=scope):
+                with self.assertNumQueries(0):
+                    ids = timelines.read(scope, object_id)
+                self.assertEqual(len(ids), 2)
+                self.assertEqual(ids[0], post.id)
@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.caching import feed_version
+from posts.models import Group, Post, PostCounter
+from posts.write_queue import (WriteQueue, get_write_queue, pending_posts,
+                               stop_write_queue)
+
+User = get_user_model()
+
+
+class YaTbWriteQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='queue_author')
+        cls.group = Group.objects.create(title='Очередь', slug='queue',
+                                         description='Подборка очереди')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_flush_writes_batch_and_counters(self):
+        """Очередь пишет пачку одной транзакцией и правит счётчики."""
+        queue = WriteQueue(batch_size=10, interval=60)
+        for number in range(3):
+            queue.put(Post(text=f'Запись {number}', author=self.author,
+                           group=self.group if number else None))
+        self.assertEqual(Post.objects.count(), 0)
+        self.assertEqual([post.text for post in pending_posts(
+            self.author.id)], ['Запись 2', 'Запись 1', 'Запись 0'])
+
+        version = feed_version(PostCounter.SCOPE_GROUP, self.group.id)
+        self.assertEqual(queue.flush(), 3)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(pending_posts(self.author.id), [])
+        self.assertEqual(PostCounter.objects.value(
+            PostCounter.SCOPE_AUTHOR, self.author.id), 3)
+        self.assertEqual(PostCounter.objects.value(
+            PostCounter.SCOPE_GROUP, self.group.id), 2)
+        self.assertNotEqual(
+            feed_version(PostCounter.SCOPE_GROUP, self.group.id), version)
+        self.assertEqual(Post.objects.first().text_html, 'Запись 2')
+
+    def test_flush_splits_into_batches(self):
+        """Каждая пачка - не больше batch_size записей."""
+        queue = WriteQueue(batch_size=2, interval=60)
+        for number in range(5):
+            queue.put(Post(text=f'Запись {number}', author=self.author))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(queue.flush(), 5)
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "posts_post"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(len(queue), 0)
+
+    def test_operational_error_requeues_batch(self):
+        """Пачка, не записанная из-за блокировки БД, ждёт следующей записи."""
+        queue = WriteQueue(batch_size=2, interval=60)
+        for number in range(3):
+            queue.put(Post(text=f'Запись {number}', author=self.author))
+        with mock.patch.object(
+                Post.objects, 'bulk_create',
+                side_effect=OperationalError('database is locked')), \
+                self.assertLogs('yatube.write_queue', 'WARNING'):
+            self.assertEqual(queue.flush(), 0)
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(len(pending_posts(self.author.id)), 3)
+        self.assertFalse(Post.objects.exists())
+
+        self.assertEqual(queue.flush(), 3)
+        self.assertEqual(list(Post.objects.order_by('id').values_list(
+            'text', flat=True)), ['Запись 0', 'Запись 1', 'Запись 2'])
+        self.assertEqual(pending_posts(self.author.id), [])
+
+    def test_integrity_error_saves_one_by_one(self):
+        """Пачку, нарушившую ограничения БД, записи сохраняют по одной."""
+        queue = WriteQueue(batch_size=10, interval=60)
+        for number in range(2):
+            queue.put(Post(text=f'Запись {number}', author=self.author))
+        with mock.patch.object(Post.objects, 'bulk_create',
+                               side_effect=IntegrityError('FOREIGN KEY')), \
+                self.assertLogs('yatube.write_queue', 'ERROR'):
+            self.assertEqual(queue.flush(), 2)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(PostCounter.objects.value(
+            PostCounter.SCOPE_AUTHOR, self.author.id), 2)
+
+
+@override_settings(POSTS_WRITE_QUEUE=True,
+                   WRITE_QUEUE_BATCH_SIZE=1000,
+                   WRITE_QUEUE_FLUSH_MS=60 * 60 * 1000)
+class YaTbWriteQueueViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='queue_writer')
+
+    def setUp(self):
+        cache.clear()
+        # фоновый поток не пишет в тестовую транзакцию: интервал - час,
+        # очередь дописывается в тесте вызовом flush()
+        self.addCleanup(stop_write_queue)
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_author_sees_pending_post(self):
+        """Запись из очереди видна в профиле автора до записи в БД."""
+        profile_url = reverse('profile', args=[self.author.username])
+        response = self.client.post(reverse('new_post'),
+                                    {'text': 'Запись в очереди'})
+        self.assertRedirects(response, profile_url)
+        self.assertFalse(Post.objects.exists())
+
+        response = self.client.get(profile_url)
+        self.assertContains(response, 'Запись в очереди')
+        self.assertContains(response, 'Публикуется')
+        self.assertNotContains(Client().get(profile_url),
+                               'Запись в очереди')
+
+        self.assertEqual(get_write_queue().flush(), 1)
+        response = self.client.get(profile_url)
+        self.assertContains(response, 'Запись в очереди', count=1)
+        self.assertNotContains(response, 'Публикуется')
@@ -0,0 +1,160 @@
+"""Готовые ленты авторов и подборок (fan-out on write).
+
+Для каждой ленты (scope, object_id) в кеше хранится массив array('q') с id
+её последних TIMELINE_SIZE записей в порядке ленты. Новая запись
+дописывается в начало массивов своих лент при сохранении, поэтому
+страница профиля или подборки выбирает записи по готовым id одним
+запросом WHERE id IN (...), без сортировки и COUNT(*).
+
+Массив, которого нет в кеше, собирается при первом чтении из основной
+БД, даже если страница читает записи с реплики: массив с отстающей
+реплики не получил бы записей, сделанных до её синхронизации. Запись,
+перенесённая в ленту задним числом (смена автора или подборки, импорт),
+сбрасывает массив целиком, удалённая - убирается из него. Массив живёт
+TIMELINE_TIMEOUT секунд со сборки - дописывание не продлевает срок,
+поэтому запись, потерянная в гонке сборки и публикации, появляется в
+ленте не позже, чем через это время. Сразу исправляет ленты
+manage.py rebuild_timelines.
+
+Включается settings.POSTS_TIMELINES; работает для постраничного режима
+пагинатора ('numbered').
+"""
+import math
+import time
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Post, PostCounter
+
+TIMELINE_KEY = 'posts:timeline:{scope}:{object_id}'
+# ленты, которые ведутся готовыми: поле Post -> scope
+TIMELINE_SCOPES = {
+    'author_id': PostCounter.SCOPE_AUTHOR,
+    'group_id': PostCounter.SCOPE_GROUP,
+}
+
+
+def timelines_enabled():
+    return (settings.POSTS_TIMELINES
+            and settings.PAGINATOR_MODE == 'numbered')
+
+
+def post_timelines(author_id, group_id):
+    """Готовые ленты, в которые входит запись с такими автором и подборкой."""
+    timelines = [(PostCounter.SCOPE_AUTHOR, author_id)]
+    if group_id is not None:
+        timelines.append((PostCounter.SCOPE_GROUP, group_id))
+    return timelines
+
+
+def _key(scope, object_id):
+    return TIMELINE_KEY.format(scope=scope, object_id=object_id)
+
+
+def _field(scope):
+    return next(field for field, field_scope in TIMELINE_SCOPES.items()
+                if field_scope == scope)
+
+
+def _store(key, expires, timeline):
+    # в кеше - (срок годности по time.time, массив): изменение массива
+    # сохраняет срок его сборки
+    timeout = math.ceil(expires - time.time())
+    if timeout > 0:
+        cache.set(key, (expires, timeline), timeout)
+    else:
+        cache.delete(key)
+
+
+def rebuild(scope, object_id):
+    """Собрать массив id ленты из основной БД и положить его в кеш."""
+    ids = (Post.objects.using(DEFAULT_DB_ALIAS)
+           .filter(**{_field(scope): object_id})
+           .order_by('-pub_date', '-id')
+           .values_list('id', flat=True)[:settings.TIMELINE_SIZE])
+    timeline = array('q', ids)
+    _store(_key(scope, object_id), time.time() + settings.TIMELINE_TIMEOUT,
+           timeline)
+    return timeline
+
+
+def read(scope, object_id):
+    """Массив id ленты; при отсутствии в кеше собирается из БД."""
+    stored = cache.get(_key(scope, object_id))
+    if stored is None:
+        return rebuild(scope, object_id)
+    return stored[1]
+
+
+def push(scope, object_id, post_id):
+    """Дописать новую запись в начало массива ленты, если он собран."""
+    key = _key(scope, object_id)
+    stored = cache.get(key)
+    if stored is None:
+        return
+    expires, timeline = stored
+    timeline.insert(0, post_id)
+    del timeline[settings.TIMELINE_SIZE:]
+    _store(key, expires, timeline)
+
+
+def discard(scope, object_id, post_id):
+    """Убрать удалённую или перенесённую запись из массива ленты."""
+    key = _key(scope, object_id)
+    stored = cache.get(key)
+    if stored is None or post_id not in stored[1]:
+        return
+    expires, timeline = stored
+    timeline.remove(post_id)
+    _store(key, expires, timeline)
+
+
+def drop(scope, object_id):
+    """Сбросить массив ленты: он соберётся заново при следующем чтении."""
+    cache.delete(_key(scope, object_id))
+
+
+class TimelineList:
+    """Последовательность записей ленты для Paginator.
+
+    Срезы в пределах массива id выбираются одним запросом по id, срезы
+    за его пределами - обычным запросом к queryset со смещением.
+
+    аргументы:
+    ids - массив id ленты из read()
+    queryset - записи той же ленты (например, profile_user.posts.feed())
+    """
+
+    def __init__(self, ids, queryset):
+        self.ids = ids
+        self.queryset = queryset
+        # массив короче предела содержит всю ленту
+        self.complete = len(ids) < settings.TIMELINE_SIZE
+
+    def count(self):
+        if self.complete:
+            return len(self.ids)
+        return self.queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        beyond = index.stop is None or index.stop > len(self.ids)
+        if beyond and not self.complete:
+            return list(self.queryset.order_by('-pub_date', '-id')[index])
+        ids = self.ids[index].tolist()
+        posts = self.queryset.in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def timeline_or_queryset(scope, object_id, queryset):
+    """Записи ленты для pagination: готовая лента или сам queryset."""
+    if not timelines_enabled():
+        return queryset
+    return TimelineList(read(scope, object_id), queryset)
@@ -1,13 +1,28 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group'),
+    path('group/<slug:slug>/feed/', feeds.GroupPostsFeed(),
+         name='group_feed'),
+    path('group/<slug:slug>/feed/atom/', feeds.AtomGroupPostsFeed(),
+         name='group_feed_atom'),
     path('new/', views.new_post, name='new_post'),
+    # во второй части адреса не число и не feed: не пересекается с
+    # адресами профилей, и пользователь search остаётся доступен
+    path('search/posts/', views.search, name='search'),
+    path('search/groups/', views.group_lookup, name='group_lookup'),
+    # общие ленты не под feed/: адрес /feed/ - профиль пользователя feed
+    path('feeds/rss/', feeds.PostsFeed(), name='feed'),
+    path('feeds/atom/', feeds.AtomPostsFeed(), name='feed_atom'),
     path('<str:username>/', views.profile, name='profile'),
+    path('<str:username>/feed/', feeds.AuthorPostsFeed(),
+         name='profile_feed'),
+    path('<str:username>/feed/atom/', feeds.AtomAuthorPostsFeed(),
+         name='profile_feed_atom'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit/', views.post_edit,
          name='post_edit'),
@@ -1,53 +1,210 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
+
+from yatube.db_router import note_write, replica_reads
+from yatube.identity import identity_map
+from yatube.throttling import throttle
 
+from .caching import GROUP_DIRECTORY_SCOPE, feed_cache_context, feed_etag
 from .forms import PostForm
-from .models import Group, Post, User
+from .group_choices import LOOKUP_LIMIT, LOOKUP_MAX_LIMIT, lookup_groups
+from .models import Group, GroupQuerySet, Post, PostCounter, User
+from .paginators import (ElidedPaginator, EstimatedCountPaginator,
+                         KeysetPaginator)
+from .search import search_posts
+from .timelines import timeline_or_queryset
+from .write_queue import get_write_queue, pending_posts, write_queue_enabled
+
+PAGINATOR_MODE_NUMBERED = 'numbered'
+PAGINATOR_MODE_KEYSET = 'keyset'
 
+# Порядки каталога подборок и их названия для переключателя
+GROUP_SORTS = (
+    ('activity', 'по активности'),
+    ('posts', 'по числу записей'),
+    ('title', 'по названию'),
+)
 
-def pagination(request, objects):
+
+def pagination(request, objects, mode=None, ordering=('-pub_date', '-id'),
+               estimate=None, count=None):
     """Рутина подготовки Пагинатора для страниц.
 
     аргументы:
-    request - HttpRequest от запрошенной страницы, содержит номер страницы,
-              для которой нужно вывести порцию объектов
+    request - HttpRequest от запрошенной страницы, содержит номер страницы
+              (или курсор after/before), для которой нужно вывести порцию
+              объектов
     objects - набор объектов, которые надо разбить постранично
+    mode - 'numbered' (номера страниц, COUNT + OFFSET) или 'keyset'
+           (курсор по ключу сортировки, один диапазонный запрос);
+           по умолчанию берётся из settings.PAGINATOR_MODE
+    ordering - ключ сортировки для режима 'keyset'
+    estimate - функция, возвращающая оценку количества объектов; при
+               оценке от settings.PAGINATOR_ESTIMATE_THRESHOLD точный
+               COUNT(*) не выполняется (только режим 'numbered')
+    count - функция, возвращающая точное количество объектов, если оно
+            дешевле COUNT(*) по objects (например, для objects с
+            агрегатами)
     return - порция объектов для номера страницы из request
     """
-    paginator = Paginator(objects, settings.PAGINATOR_DEFAULT_SIZE)
+    mode = mode or settings.PAGINATOR_MODE
+    if mode == PAGINATOR_MODE_KEYSET:
+        paginator = KeysetPaginator(
+            objects, settings.PAGINATOR_DEFAULT_SIZE, ordering)
+        return paginator.get_page(after=request.GET.get('after'),
+                                  before=request.GET.get('before'))
+
+    options = {'on_each_side': settings.PAGINATOR_ON_EACH_SIDE,
+               'on_ends': settings.PAGINATOR_ON_ENDS}
+    if estimate is None:
+        paginator = ElidedPaginator(
+            objects, settings.PAGINATOR_DEFAULT_SIZE, **options)
+    else:
+        paginator = EstimatedCountPaginator(
+            objects, settings.PAGINATOR_DEFAULT_SIZE, estimate=estimate,
+            threshold=settings.PAGINATOR_ESTIMATE_THRESHOLD, **options)
+    if count is not None:
+        paginator.count = count()
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
     return page
 
 
+def group_etag(request, slug):
+    group_id = (Group.objects.filter(slug=slug)
+                .values_list('id', flat=True).first())
+    if group_id is None:
+        return None
+    return feed_etag(request, PostCounter.SCOPE_GROUP, group_id)
+
+
+def load_post(request, username, post_id):
+    """Запись с автором и подборкой; один запрос к БД за HTTP-запрос.
+
+    Запись берётся из карты идентичности запроса, если её уже загрузила
+    функция ETag; автор, совпадающий с request.user, - это request.user.
+
+    return - Post или None, если записи с таким автором нет
+    """
+    objects = identity_map(request)
+    post = objects.get(Post, post_id)
+    if post is None:
+        post = (Post.objects.select_related('author', 'group')
+                .filter(id=post_id, author__username=username).first())
+        if post is None:
+            return None
+        post = objects.add(post)
+    if post.author.username != username:
+        return None
+    return post
+
+
+def get_post_or_404(request, username, post_id):
+    post = load_post(request, username, post_id)
+    if post is None:
+        raise Http404('Запись не найдена')
+    return post
+
+
+def author_etag(request, username, post_id=None):
+    """ETag страниц автора: профиля и отдельной записи."""
+    if post_id is None:
+        author_id = (User.objects.filter(username=username)
+                     .values_list('id', flat=True).first())
+    else:
+        # запись понадобится view: загружаем её сразу целиком
+        post = load_post(request, username, post_id)
+        author_id = post and post.author_id
+    if author_id is None:
+        return None
+    etag = feed_etag(request, PostCounter.SCOPE_AUTHOR, author_id)
+    return etag if post_id is None else f'{etag}-{post_id}'
+
+
+@replica_reads
 def index(request):
-    post_list = Post.objects.all()
-    page = pagination(request, post_list)
+    post_list = Post.objects.feed()
+    page = pagination(
+        request, post_list,
+        estimate=lambda: PostCounter.objects.value(PostCounter.SCOPE_ALL))
     return render(
         request,
         'posts/index.html',
-        {'page': page},
+        {'page': page,
+         **feed_cache_context(request, page, PostCounter.SCOPE_ALL)},
     )
 
 
+@replica_reads
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page = pagination(request, post_list)
+    post_list = timeline_or_queryset(PostCounter.SCOPE_GROUP, group.id,
+                                     group.posts.feed())
+    page = pagination(
+        request, post_list,
+        estimate=lambda: PostCounter.objects.value(PostCounter.SCOPE_GROUP,
+                                                   group.id))
 
-    return render(request, 'posts/group.html', {'group': group, 'page': page})
+    return render(request, 'posts/group.html',
+                  {'group': group, 'page': page,
+                   **feed_cache_context(request, page,
+                                        PostCounter.SCOPE_GROUP, group.id)})
 
 
+@replica_reads
 def group_index(request):
-    groups_list = Group.objects.all()
-    page = pagination(request, groups_list)
+    """Каталог подборок с количеством записей и датой последней."""
+    sort = request.GET.get('sort')
+    if sort not in GroupQuerySet.DIRECTORY_ORDERINGS:
+        sort = GroupQuerySet.DIRECTORY_DEFAULT_SORT
+    groups_list = Group.objects.directory(sort)
+    # COUNT(*) по запросу с агрегатами считал бы их для всех подборок
+    page = pagination(request, groups_list, mode=PAGINATOR_MODE_NUMBERED,
+                      count=Group.objects.count)
+    # страницы кешируются по собственной версии каталога, которую меняют
+    # только подборки: новые записи доходят до статистики не дольше чем
+    # за GROUP_DIRECTORY_CACHE_TIMEOUT
     return render(request, 'posts/group_index.html',
-                  {'groups': groups_list, 'page': page})
+                  {'page': page, 'sort': sort,
+                   'sorts': GROUP_SORTS,
+                   'query_string': urlencode({'sort': sort}) + '&',
+                   **feed_cache_context(
+                       request, page, GROUP_DIRECTORY_SCOPE,
+                       vary_on=[sort],
+                       timeout=settings.GROUP_DIRECTORY_CACHE_TIMEOUT)})
+
+
+def search(request):
+    """Полнотекстовый поиск по записям, результаты по релевантности."""
+    query = request.GET.get('q', '').strip()
+    post_list = search_posts(Post.objects.feed(), query)
+    page = pagination(request, post_list, mode=PAGINATOR_MODE_NUMBERED)
+    return render(request, 'posts/search.html',
+                  {'page': page, 'query': query,
+                   'query_string': urlencode({'q': query}) + '&'})
+
+
+@replica_reads
+def group_lookup(request):
+    """Подборки по началу названия для поля group формы записи, JSON."""
+    try:
+        limit = int(request.GET.get('limit', LOOKUP_LIMIT))
+    except ValueError:
+        limit = LOOKUP_LIMIT
+    limit = max(1, min(limit, LOOKUP_MAX_LIMIT))
+    groups = lookup_groups(request.GET.get('q', ''), limit)
+    return JsonResponse({'results': [{'id': pk, 'title': title}
+                                     for pk, title in groups]})
 
 
 @login_required
+@throttle('posts_write')
 def new_post(request):
     """For post-obj create form, render and check it, then save model-obj."""
     # initialise PostForm() with 'None' if request.POST absent
@@ -56,6 +213,11 @@ def new_post(request):
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
+        if write_queue_enabled():
+            get_write_queue().put(new_post)
+            note_write()
+            # до записи очереди в БД запись видна только в профиле автора
+            return redirect('profile', username=request.user.username)
         new_post.save()
         return redirect('index')
 
@@ -63,26 +225,49 @@ def new_post(request):
                   {'form': form, 'edit_flag': False})
 
 
+@replica_reads
+@condition(etag_func=author_etag)
 def profile(request, username):
     profile_user = get_object_or_404(User, username=username)
 
-    user_posts = profile_user.posts.all()
-    page = pagination(request, user_posts)
+    posts_count = PostCounter.objects.value(PostCounter.SCOPE_AUTHOR,
+                                            profile_user.id)
+
+    user_posts = timeline_or_queryset(PostCounter.SCOPE_AUTHOR,
+                                      profile_user.id,
+                                      profile_user.posts.feed())
+    page = pagination(request, user_posts, estimate=lambda: posts_count)
+    pending = []
+    if (write_queue_enabled() and request.user == profile_user
+            and not page.has_previous()):
+        pending = pending_posts(profile_user.id)
 
     return render(request, 'posts/profile.html',
                   {'profile_user': profile_user,
-                   'page': page})
+                   'posts_count': posts_count,
+                   'page': page,
+                   'pending_posts': pending,
+                   **feed_cache_context(
+                       request, page, PostCounter.SCOPE_AUTHOR,
+                       profile_user.id,
+                       vary_on=[request.user == profile_user])})
 
 
+@replica_reads
+@condition(etag_func=author_etag)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = get_post_or_404(request, username, post_id)
+    posts_count = PostCounter.objects.value(PostCounter.SCOPE_AUTHOR,
+                                            post.author_id)
     return render(request, 'posts/post.html',
-                  {'post': post, 'author': post.author})
+                  {'post': post, 'author': post.author,
+                   'posts_count': posts_count})
 
 
 @login_required
+@throttle('posts_write')
 def post_edit(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = get_post_or_404(request, username, post_id)
     if post.author != request.user:
         return redirect('post', username=username,
                         post_id=post_id)
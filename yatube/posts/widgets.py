@@ -0,0 +1,24 @@
+from django import forms
+from django.urls import reverse
+
+from .group_choices import group_choices
+
+
+class GroupTypeahead(forms.Widget):
+    """Выбор подборки вводом начала названия вместо <select>.
+
+    Выводит текстовое поле с подсказками из group_lookup и скрытое поле
+    с id выбранной подборки, поэтому размер страницы формы не зависит от
+    числа подборок.
+    """
+    template_name = 'posts/widgets/group_typeahead.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        try:
+            title = dict(group_choices()).get(int(value))
+        except (TypeError, ValueError):
+            title = None
+        context['widget'].update(title=title or '',
+                                 lookup_url=reverse('group_lookup'))
+        return context
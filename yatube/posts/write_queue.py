@@ -0,0 +1,261 @@
+"""Отложенная запись новых постов пачками (write-behind).
+
+Проверенная форма новой записи не сохраняется в запросе, а ставится в
+очередь процесса. Фоновый поток записывает очередь в БД каждые
+WRITE_QUEUE_FLUSH_MS миллисекунд или сразу по набору WRITE_QUEUE_BATCH_SIZE
+записей: одна транзакция с bulk_create и пересчётом счётчиков на всю
+пачку вместо транзакции на каждый запрос, поэтому при всплеске
+публикаций запросы не ждут по очереди блокировку записи SQLite.
+
+Пока запись в очереди, её видит только автор: записи автора лежат в
+кеше (PENDING_KEY) и выводятся в его профиле поверх ленты из БД.
+Дата публикации проставляется при записи пачки. Если пачка нарушает
+ограничения БД, записи сохраняются по одной и теряются только
+нарушившие; при прочих ошибках БД (например, блокировка) пачка
+возвращается в начало очереди и пишется в следующий раз. Записи, не
+дождавшиеся записи, теряются при аварийном завершении процесса; при
+обычной остановке очередь дописывается (atexit).
+
+Включается settings.POSTS_WRITE_QUEUE.
+"""
+import atexit
+import logging
+import threading
+import uuid
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       connections, transaction)
+from django.utils import timezone
+
+from . import timelines
+from .caching import bump_feed_version
+from .models import Post, PostCounter
+from .signals import post_scopes
+
+logger = logging.getLogger('yatube.write_queue')
+
+PENDING_KEY = 'posts:pending:{author_id}'
+# запись заведомо дойдёт до БД раньше, чем истечёт ключ
+PENDING_TIMEOUT = 60 * 5
+# сколько последних записей автора из очереди выводит профиль
+PENDING_LIMIT = 20
+
+
+def write_queue_enabled():
+    return settings.POSTS_WRITE_QUEUE
+
+
+def pending_posts(author_id):
+    """Записи автора, ожидающие в очереди, от новых к старым."""
+    pending = cache.get(PENDING_KEY.format(author_id=author_id)) or []
+    return [post for _, post in reversed(pending)]
+
+
+def _add_pending(token, post):
+    key = PENDING_KEY.format(author_id=post.author_id)
+    pending = cache.get(key) or []
+    pending.append((token, post))
+    # при серии публикаций ключ не растёт вместе с очередью
+    cache.set(key, pending[-PENDING_LIMIT:], PENDING_TIMEOUT)
+
+
+def _remove_pending(author_id, tokens):
+    key = PENDING_KEY.format(author_id=author_id)
+    pending = [(token, post) for token, post in cache.get(key) or []
+               if token not in tokens]
+    if pending:
+        cache.set(key, pending, PENDING_TIMEOUT)
+    else:
+        cache.delete(key)
+
+
+class WriteQueue:
+    """Очередь новых записей с фоновым потоком, пишущим её пачками.
+
+    аргументы:
+    batch_size - записей в одной транзакции; полная пачка пишется сразу
+    interval - как часто писать неполную пачку, секунды
+    """
+
+    def __init__(self, batch_size, interval):
+        self.batch_size = batch_size
+        self.interval = interval
+        # (token, Post) в порядке поступления
+        self.items = deque()
+        self.lock = threading.Lock()
+        # пачки пишутся по одной, из потока или из flush() снаружи
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                                       name='posts-write-queue')
+        self.thread.start()
+
+    def stop(self):
+        """Остановить поток и дописать оставшиеся записи."""
+        self.stopped = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
+
+    def put(self, post):
+        """Поставить новую запись в очередь; return - её token."""
+        post = Post(text=post.text, author_id=post.author_id,
+                    group_id=post.group_id, pub_date=timezone.now())
+        post.render_text()
+        token = uuid.uuid4().hex
+        _add_pending(token, post)
+        with self.lock:
+            self.items.append((token, post))
+            full = len(self.items) >= self.batch_size
+        # закешированный профиль автора должен показать запись из очереди
+        bump_feed_version(PostCounter.SCOPE_AUTHOR, post.author_id)
+        if full:
+            self.wake.set()
+        return token
+
+    def __len__(self):
+        return len(self.items)
+
+    def run(self):
+        while not self.stopped:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            # поток живёт дольше CONN_MAX_AGE, как воркер между запросами
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Ошибка записи очереди')
+        connections.close_all()
+
+    def flush(self):
+        """Записать всё, что есть в очереди; return - сколько записано.
+
+        Если БД не принимает записи, остаток пачки возвращается в очередь
+        и запись прерывается до следующего вызова.
+        """
+        written = 0
+        with self.flush_lock:
+            while True:
+                with self.lock:
+                    batch = [self.items.popleft() for _ in
+                             range(min(self.batch_size, len(self.items)))]
+                if not batch:
+                    return written
+                batch_written, complete = self.write(batch)
+                written += batch_written
+                if not complete:
+                    return written
+
+    def requeue(self, batch):
+        """Вернуть записи в начало очереди в прежнем порядке."""
+        for _, post in batch:
+            # bulk_create успел пометить записи сохранёнными
+            post.pk = None
+            post._state.adding = True
+        with self.lock:
+            self.items.extendleft(reversed(batch))
+
+    def write(self, batch):
+        """Записать пачку одной транзакцией.
+
+        return - сколько записей сохранено и обработана ли пачка целиком;
+                 необработанные записи возвращены в очередь
+        """
+        posts = [post for _, post in batch]
+        counters = Counter(
+            scope for post in posts
+            for scope in post_scopes(post.author_id, post.group_id))
+        try:
+            with transaction.atomic():
+                # pub_date - время записи пачки (auto_now_add)
+                Post.objects.bulk_create(posts)
+                # bulk_create не шлёт сигналов: счётчики правим сами
+                for (scope, object_id), delta in counters.items():
+                    PostCounter.objects.bump(scope, object_id, delta)
+        except IntegrityError:
+            # например, подборку удалили, пока запись ждала в очереди
+            logger.exception('Пачка из %s записей не записана, записи '
+                             'сохраняются по одной', len(batch))
+            written, done = self.write_one_by_one(batch)
+        except DatabaseError:
+            # блокировка или потерянное соединение: записи не виноваты
+            logger.warning('Пачка из %s записей не записана, повтор при '
+                           'следующей записи очереди', len(batch),
+                           exc_info=True)
+            written, done = 0, 0
+        else:
+            written, done = len(posts), len(batch)
+            for scope, object_id in counters:
+                bump_feed_version(scope, object_id)
+                if scope in timelines.TIMELINE_SCOPES.values():
+                    # bulk_create в SQLite не возвращает id: ленты
+                    # соберутся заново при чтении
+                    timelines.drop(scope, object_id)
+
+        tokens = {}
+        for token, post in batch[:done]:
+            tokens.setdefault(post.author_id, set()).add(token)
+        for author_id, author_tokens in tokens.items():
+            _remove_pending(author_id, author_tokens)
+        if done < len(batch):
+            self.requeue(batch[done:])
+        return written, done == len(batch)
+
+    @staticmethod
+    def write_one_by_one(batch):
+        """Сохранить записи по одной, пропуская нарушающие ограничения БД.
+
+        return - сколько записей сохранено и сколько записей пачки
+                 обработано: при другой ошибке БД запись прерывается
+        """
+        written = 0
+        for done, (_, post) in enumerate(batch):
+            post.pk = None
+            post._state.adding = True
+            try:
+                post.save()
+            except IntegrityError:
+                logger.exception('Запись автора %s потеряна',
+                                 post.author_id)
+            except DatabaseError:
+                logger.warning('Записи не сохраняются по одной, повтор '
+                               'при следующей записи очереди',
+                               exc_info=True)
+                return written, done
+            else:
+                written += 1
+        return written, len(batch)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """Очередь процесса; создаётся и запускается при первом обращении."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteQueue(settings.WRITE_QUEUE_BATCH_SIZE,
+                                settings.WRITE_QUEUE_FLUSH_MS / 1000)
+            _queue.start()
+        return _queue
+
+
+@atexit.register
+def stop_write_queue():
+    """Остановить очередь процесса, дописав её."""
+    global _queue
+    with _queue_lock:
+        queue, _queue = _queue, None
+    if queue is not None:
+        queue.stop()
@@ -0,0 +1,167 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 не умеет ни асинхронных view, ни get_asgi_application, а ORM
+у него только синхронный. Поэтому ASGI-приложение здесь - переходник:
+событийный цикл сервера (uvicorn, daphne, hypercorn) принимает соединения
+и читает тела запросов, а сам Django-обработчик вместе с доступом к БД
+выполняется в ограниченном пуле потоков (settings.ASGI_THREADS). Медленное
+чтение из БД занимает поток пула, но не блокирует цикл и приём других
+соединений; запросы сверх размера пула ждут в очереди пула.
+
+Запуск: uvicorn yatube.asgi:application
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+
+class WsgiToAsgi:
+    """ASGI-приложение, выполняющее WSGI-приложение в пуле потоков.
+
+    аргументы:
+    wsgi_application - WSGI callable (обработчик Django)
+    max_workers - размер пула потоков, то есть сколько запросов
+                  обрабатываются одновременно
+    """
+
+    def __init__(self, wsgi_application, max_workers):
+        self.wsgi_application = wsgi_application
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi-wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип соединения: '
+                             f'{scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            # клиент отключился, не дождавшись ответа
+            return
+        environ = self.build_environ(scope, body)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor, self.run_wsgi, environ, send, loop)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        """Тело запроса целиком или None, если клиент отключился."""
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    @staticmethod
+    def build_environ(scope, body):
+        """WSGI environ (PEP 3333) из ASGI scope HTTP-запроса."""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '')
+            .encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for raw_name, raw_value in scope.get('headers', ()):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            if name in environ:
+                # повторы заголовка склеиваются через запятую (RFC 7230),
+                # кроме Cookie: его части разделяются '; ' (RFC 6265)
+                separator = '; ' if name == 'HTTP_COOKIE' else ','
+                value = f'{environ[name]}{separator}{value}'
+            environ[name] = value
+        return environ
+
+    def run_wsgi(self, environ, send, loop):
+        """Выполнить WSGI-приложение в потоке пула и отдать ответ в цикл.
+
+        Ответ передаётся частями по мере итерации, поэтому потоковые
+        ответы (RSS/Atom ленты) не собираются в памяти целиком.
+        """
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start['status'] = int(status.split(' ', 1)[0])
+            start['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers]
+
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def send_start():
+            send_sync({'type': 'http.response.start',
+                       'status': start['status'],
+                       'headers': start['headers']})
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            started = False
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not started:
+                    send_start()
+                    started = True
+                send_sync({'type': 'http.response.body', 'body': chunk,
+                           'more_body': True})
+            if not started:
+                send_start()
+            send_sync({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+
+
+def get_asgi_application():
+    from django.conf import settings
+
+    return WsgiToAsgi(get_wsgi_application(),
+                      max_workers=settings.ASGI_THREADS)
+
+
+application = get_asgi_application()
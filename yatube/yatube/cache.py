@@ -0,0 +1,278 @@
+"""Двухуровневый кеш: LRU в памяти процесса поверх общего кеша.
+
+Локальный уровень ограничен числом записей, объёмом в байтах и временем
+жизни записи (LOCAL_TIMEOUT): он снимает с общего уровня горячие ключи
+лент, профилей и подборок. Общий уровень (файловый кеш, Redis, memcached -
+любой alias из CACHES) виден всем воркерам gunicorn, поэтому сброс версии
+ленты в одном воркере доходит до остальных не позже LOCAL_TIMEOUT.
+
+Статистика попаданий, промахов и вытеснений копится в процессе и
+периодически сбрасывается в общий уровень, откуда её собирает
+manage.py cache_stats.
+"""
+import os
+import pickle
+import socket
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import locks
+
+STATS_KEY = 'tiered-cache-stats:{name}:{worker}'
+STATS_WORKERS_KEY = 'tiered-cache-stats:{name}:workers'
+STATS_FIELDS = ('local_hits', 'shared_hits', 'misses', 'sets', 'evictions')
+# файл блокировки incr в каталоге файлового общего кеша; clear() и
+# отсев старых записей FileBasedCache трогают только файлы *.djcache
+INCR_LOCK_FILE = 'incr.lock'
+
+
+class LocalTier:
+    """LRU в памяти процесса с TTL и пределами по числу записей и объёму.
+
+    Общий для всех потоков процесса: Django создаёт экземпляр бэкенда на
+    каждый поток, а хранилище и статистика должны быть одни на процесс.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (срок годности, pickle); порядок - от старых к свежим
+        self.store = OrderedDict()
+        self.size = 0
+        self.lock = Lock()
+        self.stats = dict.fromkeys(STATS_FIELDS, 0)
+        self.stats_flushed_at = time.monotonic()
+
+    def count(self, field, interval):
+        """Учесть событие field в статистике.
+
+        return - True, если с прошлого сброса статистики прошло interval
+                 секунд и сбросить её должен этот вызов
+        """
+        with self.lock:
+            self.stats[field] += 1
+            now = time.monotonic()
+            if now - self.stats_flushed_at < interval:
+                return False
+            self.stats_flushed_at = now
+            return True
+
+    def snapshot(self):
+        """Согласованная копия статистики и размеров уровня."""
+        with self.lock:
+            return dict(self.stats, local_entries=len(self.store),
+                        local_bytes=self.size)
+
+    def get(self, key):
+        with self.lock:
+            item = self.store.get(key)
+            if item is None:
+                return None
+            expires, pickled = item
+            if expires <= time.monotonic():
+                self._delete(key)
+                return None
+            self.store.move_to_end(key)
+        return pickled
+
+    def set(self, key, pickled, ttl):
+        with self.lock:
+            self._delete(key)
+            if ttl <= 0 or len(pickled) > self.max_bytes:
+                return
+            self.store[key] = (time.monotonic() + ttl, pickled)
+            self.size += len(pickled)
+            while (len(self.store) > self.max_entries
+                   or self.size > self.max_bytes):
+                _, (_, evicted) = self.store.popitem(last=False)
+                self.size -= len(evicted)
+                self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self.lock:
+            self._delete(key)
+
+    def _delete(self, key):
+        item = self.store.pop(key, None)
+        if item is not None:
+            self.size -= len(item[1])
+
+    def clear(self):
+        with self.lock:
+            self.store.clear()
+            self.size = 0
+
+
+# Локальные уровни по (имени кеша, alias общего кеша), как хранилища у
+# LocMemCache
+_local_tiers = {}
+_local_tiers_lock = Lock()
+# incr общего уровня из потоков процесса идут по одному
+_incr_lock = Lock()
+
+
+class TieredCache(BaseCache):
+    """Бэкенд кеша из двух уровней.
+
+    LOCATION - имя локального уровня, обязательно: кеши с одним именем и
+               одним общим кешем делят память
+    OPTIONS:
+    SHARED_ALIAS - alias общего кеша в CACHES
+    LOCAL_MAX_ENTRIES - предел числа записей локального уровня
+    LOCAL_MAX_BYTES - предел объёма локального уровня (по размеру pickle)
+    LOCAL_TIMEOUT - сколько секунд значение живёт в локальном уровне
+    STATS_FLUSH_INTERVAL - как часто сбрасывать статистику, секунды
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        if not name:
+            # без имени все alias с этим бэкендом делили бы один LRU
+            raise ImproperlyConfigured(
+                'TieredCache: укажите LOCATION - имя локального уровня')
+        options = params.get('OPTIONS', {})
+        self._name = name
+        self._shared_alias = options['SHARED_ALIAS']
+        self._local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self._stats_interval = float(options.get('STATS_FLUSH_INTERVAL', 30))
+        with _local_tiers_lock:
+            tier_key = (name, self._shared_alias)
+            if tier_key not in _local_tiers:
+                _local_tiers[tier_key] = LocalTier(
+                    max_entries=int(options.get('LOCAL_MAX_ENTRIES', 1000)),
+                    max_bytes=int(options.get('LOCAL_MAX_BYTES',
+                                              16 * 1024 * 1024)),
+                )
+            self._local = _local_tiers[tier_key]
+        self._worker = f'{socket.gethostname()}:{os.getpid()}'
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    @property
+    def stats(self):
+        return self._local.stats
+
+    def _local_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        ttl = self._local_timeout
+        if timeout is not None:
+            ttl = min(ttl, timeout)
+        self._local.set(key, pickle.dumps(value, self.pickle_protocol), ttl)
+
+    # Статистика
+
+    def _count(self, field):
+        if self._local.count(field, self._stats_interval):
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Записать статистику процесса в общий уровень."""
+        timeout = max(self._stats_interval * 10, 3600)
+        workers_key = STATS_WORKERS_KEY.format(name=self._name)
+        workers = set(self.shared.get(workers_key) or ())
+        if self._worker not in workers:
+            workers.add(self._worker)
+            self.shared.set(workers_key, workers, timeout)
+        self.shared.set(
+            STATS_KEY.format(name=self._name, worker=self._worker),
+            self._local.snapshot(), timeout)
+
+    def collect_stats(self):
+        """Статистика всех воркеров из общего уровня: {воркер: словарь}."""
+        self.flush_stats()
+        workers = self.shared.get(STATS_WORKERS_KEY.format(name=self._name))
+        collected = {}
+        for worker in sorted(workers or ()):
+            stats = self.shared.get(
+                STATS_KEY.format(name=self._name, worker=worker))
+            if stats is not None:
+                collected[worker] = stats
+        return collected
+
+    # Интерфейс BaseCache
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_key(key, version=version)
+        self.validate_key(local_key)
+        pickled = self._local.get(local_key)
+        if pickled is not None:
+            self._count('local_hits')
+            return pickle.loads(pickled)
+        sentinel = object()
+        value = self.shared.get(key, sentinel, version=version)
+        if value is sentinel:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        self._local_set(local_key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_key(key, version=version)
+        self.validate_key(local_key)
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(local_key, value, timeout)
+        self._count('sets')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self.shared.add(key, value, timeout, version=version):
+            return False
+        local_key = self.make_key(key, version=version)
+        self._local_set(local_key, value, timeout)
+        self._count('sets')
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    @contextmanager
+    def _incr_guard(self):
+        """Исключительный доступ к incr общего уровня.
+
+        incr у FileBasedCache - это get и set без блокировки: два воркера,
+        одновременно поднявшие версию ленты, получили бы одно значение.
+        Для файлового кеша incr идёт под блокировкой файла в его
+        каталоге, общей для всех процессов; Redis и memcached делают incr
+        атомарно сами.
+        """
+        with _incr_lock:
+            directory = getattr(self.shared, '_dir', None)
+            if directory is None:
+                yield
+                return
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, INCR_LOCK_FILE), 'ab') as lock:
+                locks.lock(lock, locks.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    locks.unlock(lock)
+
+    def incr(self, key, delta=1, version=None):
+        # счётчики (версии лент) живут только в общем уровне
+        with self._incr_guard():
+            value = self.shared.incr(key, delta, version=version)
+        self._local.delete(self.make_key(key, version=version))
+        return value
+
+    def delete(self, key, version=None):
+        self._local.delete(self.make_key(key, version=version))
+        self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local.get(self.make_key(key, version=version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def clear(self):
+        self._local.clear()
+        self.shared.clear()
@@ -0,0 +1,66 @@
+"""SQLite с настройкой PRAGMA при открытии каждого соединения.
+
+Стандартный бэкенд Django открывает базу с настройками по умолчанию:
+журнал отката, при котором пишущий запрос блокирует читателей, и
+небольшой страничный кеш. Этот бэкенд применяет PRAGMA из
+OPTIONS['pragmas'] к каждому новому соединению, например:
+
+    'OPTIONS': {
+        'timeout': 20,
+        'pragmas': {'journal_mode': 'wal', 'synchronous': 'normal'},
+        'transaction_mode': 'IMMEDIATE',
+    }
+
+transaction_mode задаёт, как atomic() начинает транзакцию: BEGIN
+IMMEDIATE сразу берёт блокировку записи и ждёт её busy_timeout. При
+обычном BEGIN (DEFERRED) транзакция, начавшая с чтения (в том числе
+триггеры полнотекстового индекса), не может дождаться блокировки
+записи и сразу падает с "database is locked".
+
+Остальные ключи OPTIONS передаются в sqlite3.connect как обычно.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+PRAGMA_VALUE_RE = re.compile(r'^[A-Za-z0-9_-]+$')
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполнить PRAGMA name = value для каждой пары из pragmas.
+
+    journal_mode идёт первым: от режима журнала зависит смысл остальных
+    настроек (например, synchronous = normal безопасен только в WAL).
+    """
+    names = sorted(pragmas, key=lambda name: name != 'journal_mode')
+    for name in names:
+        value = str(pragmas[name])
+        if not (PRAGMA_VALUE_RE.match(name) and PRAGMA_VALUE_RE.match(value)):
+            raise ImproperlyConfigured(f'Недопустимая PRAGMA {name}={value}')
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # PRAGMA применяются после открытия, sqlite3.connect их не знает
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection,
+                      self.settings_dict['OPTIONS'].get('pragmas', {}))
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is None:
+            return super()._start_transaction_under_autocommit()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'Недопустимый transaction_mode {mode}')
+        self.cursor().execute(f'BEGIN {mode}')
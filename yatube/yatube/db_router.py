@@ -0,0 +1,174 @@
+"""Чтение с реплик БД для страниц, которые ничего не пишут.
+
+Реплики перечислены в settings.DATABASE_REPLICAS. Запросы на чтение
+уходят на реплику только внутри view, обёрнутых replica_reads (ленты и
+страница записи); всё остальное, включая любые записи, идёт в default.
+
+После записи пользователь на REPLICA_PIN_SECONDS секунд закрепляется за
+основной БД (cookie ставит ReplicaRoutingMiddleware), чтобы сразу увидеть
+свою запись, даже если реплика ещё не догнала основную БД. Реплика, на
+которой запрос упал, на REPLICA_RETRY_SECONDS исключается из выбора, а
+view повторяется на основной БД.
+
+Страница, прочитанная с реплики, может отставать от основной БД, хотя
+версия ленты в кеше уже сменилась записью. Поэтому ключи кеша страниц и
+ETag включают источник чтения (read_source): основную БД или реплику с
+поколением её копии, которое manage.py sync_replicas меняет после
+каждой синхронизации.
+"""
+import functools
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+logger = logging.getLogger('yatube.db')
+
+PIN_COOKIE = 'yatube_primary'
+REPLICA_GENERATION_KEY = 'db:replica-generation'
+
+
+class RoutingState:
+    """Маршрутизация запросов к БД в рамках одного HTTP-запроса.
+
+    аргументы:
+    pinned - читать только с основной БД
+    """
+    __slots__ = ('pinned', 'replica_allowed', 'replica', 'generation',
+                 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica_allowed = False
+        # реплика, выбранная для этого запроса, и поколение её копии
+        self.replica = None
+        self.generation = None
+        self.wrote = False
+
+
+current_routing = ContextVar('current_routing', default=None)
+
+# alias реплики -> время (time.monotonic), до которого она не выбирается
+_unhealthy = {}
+
+
+def healthy_replicas():
+    now = time.monotonic()
+    return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', ())
+            if _unhealthy.get(alias, 0) <= now]
+
+
+def mark_unhealthy(alias):
+    _unhealthy[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+
+def replica_generation():
+    """Поколение копий реплик; заводится при отсутствии."""
+    generation = cache.get(REPLICA_GENERATION_KEY)
+    if generation is None:
+        # поколение со времени не совпадёт с закешированными до
+        # вытеснения ключа
+        cache.add(REPLICA_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(REPLICA_GENERATION_KEY, 0)
+    return generation
+
+
+def bump_replica_generation():
+    """Реплики получили новую копию основной БД."""
+    try:
+        cache.incr(REPLICA_GENERATION_KEY)
+    except ValueError:
+        cache.set(REPLICA_GENERATION_KEY, time.time_ns(), None)
+
+
+def read_source():
+    """Откуда читает текущий запрос, для ключей кеша страниц и ETag.
+
+    Выбирает реплику, если запросу разрешено читать с неё и она ещё не
+    выбрана.
+
+    return - 'default' или 'реплика:поколение'
+    """
+    alias = ReplicaRouter().db_for_read(None)
+    if alias == DEFAULT_DB_ALIAS:
+        return alias
+    return f'{alias}:{current_routing.get().generation}'
+
+
+def note_write():
+    """Закрепить пользователя за основной БД после записи в обход ORM.
+
+    Например, для записи из очереди posts.write_queue, которая попадёт в
+    основную БД после ответа на запрос.
+    """
+    state = current_routing.get()
+    if state is not None:
+        state.wrote = True
+
+
+class ReplicaRouter:
+    """Чтения внутри replica_reads - на реплику, остальное - в default."""
+
+    def db_for_read(self, model, **hints):
+        state = current_routing.get()
+        if state is None or state.pinned or not state.replica_allowed:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            replicas = healthy_replicas()
+            if not replicas:
+                return DEFAULT_DB_ALIAS
+            # одна реплика на весь запрос: страница видит один снимок БД
+            state.replica = random.choice(replicas)
+            # поколение - до первого соединения с репликой: данные не
+            # старше копии этого поколения
+            state.generation = replica_generation()
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики - копии default, объекты с них связываются свободно
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схема реплик приходит вместе с данными из основной БД
+        return db == DEFAULT_DB_ALIAS
+
+
+def replica_reads(view):
+    """Разрешить view, который ничего не пишет, читать с реплики.
+
+    Если запрос к реплике падает, реплика исключается из выбора, а view
+    выполняется ещё раз на основной БД.
+    """
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = current_routing.get()
+        if state is None or state.pinned:
+            return view(request, *args, **kwargs)
+        state.replica_allowed = True
+        try:
+            return view(request, *args, **kwargs)
+        except DatabaseError:
+            if state.replica is None:
+                raise
+            logger.warning('Реплика %s недоступна, чтение с основной БД',
+                           state.replica, exc_info=True)
+            mark_unhealthy(state.replica)
+            state.pinned = True
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica_allowed = False
+            state.replica = None
+            state.generation = None
+
+    return wrapper
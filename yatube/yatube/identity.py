@@ -0,0 +1,62 @@
+"""Карта идентичности запроса: один объект на строку БД.
+
+Объекты моделей, загруженные за время HTTP-запроса, регистрируются в
+карте по (модели, pk). Повторное обращение к той же строке - из функции
+ETag, из самого view или через связь другого объекта - получает уже
+загруженный объект без запроса к БД. Первым в карту попадает
+request.user, поэтому автор записи, совпадающий с текущим
+пользователем, не загружается второй раз.
+
+Карта хранится в атрибуте запроса и живёт, пока живёт запрос.
+"""
+
+REQUEST_ATTRIBUTE = '_identity_map'
+
+
+class IdentityMap:
+    """Объекты моделей по (модель, pk)."""
+
+    def __init__(self):
+        self.objects = {}
+
+    @staticmethod
+    def _key(model, pk):
+        return model._meta.concrete_model, pk
+
+    def get(self, model, pk):
+        return self.objects.get(self._key(model, pk))
+
+    def add(self, instance):
+        """Зарегистрировать instance и загруженные вместе с ним объекты.
+
+        Связанные объекты из select_related заменяются объектами из
+        карты, если те уже были загружены.
+
+        return - объект карты для этой строки: instance или загруженный
+                 ранее
+        """
+        key = self._key(instance.__class__, instance.pk)
+        known = self.objects.get(key)
+        if known is not None:
+            return known
+        self.objects[key] = instance
+        for field in instance._meta.concrete_fields:
+            if field.is_relation and field.is_cached(instance):
+                related = field.get_cached_value(instance)
+                if related is not None:
+                    field.set_cached_value(instance, self.add(related))
+        return instance
+
+
+def identity_map(request):
+    """Карта идентичности запроса; создаётся при первом обращении."""
+    objects = getattr(request, REQUEST_ATTRIBUTE, None)
+    if objects is None:
+        objects = IdentityMap()
+        user = request.user
+        if user.is_authenticated:
+            # ленивый объект из AuthenticationMiddleware: is_authenticated
+            # его уже загрузил
+            objects.objects[IdentityMap._key(user.__class__, user.pk)] = user
+        setattr(request, REQUEST_ATTRIBUTE, objects)
+    return objects
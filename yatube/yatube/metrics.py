@@ -0,0 +1,132 @@
+"""Метрики запросов: время view, запросы к БД, шаблоны, размер ответа.
+
+Метрики текущего запроса лежат в ContextVar, чтобы их могли дополнять
+обёртка курсора БД и бэкенд шаблонов, не зная о middleware. Итоги по
+каждому view копятся в ограниченной выборке последних запросов, из
+которой считаются перцентили.
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+
+PERCENTILES = (50, 90, 99)
+
+current_metrics = contextvars.ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'view', 'total', 'db_queries', 'db_time',
+                 'template_time', 'templates', 'response_size', 'throttled')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.total = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        # время отрисовки по шаблонам, включая вложенные в них
+        self.templates = {}
+        self.response_size = None
+        # ограничитель, отклонивший запрос (yatube/throttling.py)
+        self.throttled = None
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper: считает запросы."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def as_dict(self):
+        data = {
+            'view': self.view,
+            'total_ms': round(self.total * 1000, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'response_bytes': self.response_size,
+        }
+        if self.templates:
+            data['templates_ms'] = {
+                name: round(seconds * 1000, 2)
+                for name, seconds in self.templates.items()
+            }
+        if self.throttled:
+            data['throttled'] = self.throttled
+        return data
+
+
+def record_template_time(seconds):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.template_time += seconds
+
+
+def record_template_profile(name, seconds):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.templates[name] = metrics.templates.get(name, 0) + seconds
+
+
+def record_throttled(scope):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.throttled = scope
+
+
+class MetricsRegistry:
+    """Последние sample_size замеров по каждому view и их перцентили."""
+
+    def __init__(self, sample_size=1000):
+        self.sample_size = sample_size
+        self._samples = defaultdict(lambda: deque(maxlen=self.sample_size))
+        # число отклонённых ограничителем запросов по view, за всё время
+        self._throttled = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, metrics):
+        with self._lock:
+            self._samples[metrics.view].append(
+                (metrics.total, metrics.db_queries, metrics.db_time,
+                 metrics.template_time))
+            if metrics.throttled:
+                self._throttled[metrics.view] += 1
+
+    def summary(self):
+        """{view: {'count', 'throttled', 'total_p50_ms', ...}}"""
+        with self._lock:
+            samples = {view: list(rows)
+                       for view, rows in self._samples.items()}
+            throttled = dict(self._throttled)
+        summary = {}
+        for view, rows in samples.items():
+            columns = dict(zip(
+                ('total_ms', 'db_queries', 'db_ms', 'template_ms'),
+                zip(*rows)))
+            stats = {'count': len(rows),
+                     'throttled': throttled.get(view, 0)}
+            for name, values in columns.items():
+                scale = 1 if name == 'db_queries' else 1000
+                ordered = sorted(values)
+                for percentile in PERCENTILES:
+                    index = min(len(ordered) - 1,
+                                len(ordered) * percentile // 100)
+                    stats[f'{name}_p{percentile}'] = round(
+                        ordered[index] * scale, 2)
+            summary[view] = stats
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._throttled.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,85 @@
+import json
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .db_router import PIN_COOKIE, RoutingState, current_routing
+from .metrics import RequestMetrics, current_metrics, registry
+
+logger = logging.getLogger('yatube.metrics')
+
+
+class RequestMetricsMiddleware:
+    """Замер времени, запросов к БД, шаблонов и размера ответа.
+
+    Результат уходит в заголовок Server-Timing, в лог yatube.metrics
+    строкой JSON и в registry для перцентилей по каждому view. Каждые
+    REQUEST_METRICS_SUMMARY_EVERY запросов в лог пишется сводка
+    перцентилей.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.summary_every = getattr(
+            settings, 'REQUEST_METRICS_SUMMARY_EVERY', 1000)
+        self.requests = 0
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        metrics.finish()
+
+        match = getattr(request, 'resolver_match', None)
+        metrics.view = match.view_name if match else request.path_info
+        if not response.streaming:
+            metrics.response_size = len(response.content)
+
+        response['Server-Timing'] = ', '.join((
+            f'total;dur={metrics.total * 1000:.1f}',
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.db_queries} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+        ))
+        registry.add(metrics)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(dict(metrics.as_dict(),
+                                        status=response.status_code)))
+
+        self.requests += 1
+        if self.summary_every and self.requests % self.summary_every == 0:
+            logger.info('summary %s', json.dumps(registry.summary()))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Состояние маршрутизации чтений для yatube.db_router.
+
+    Пользователь, в запросе которого была запись в БД, получает cookie
+    PIN_COOKIE на REPLICA_PIN_SECONDS секунд, и пока она жива, все его
+    чтения идут в основную БД.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = current_routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(PIN_COOKIE, '1', httponly=True,
+                                max_age=settings.REPLICA_PIN_SECONDS)
+        return response
@@ -39,6 +39,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.middleware.RequestMetricsMiddleware',
+    'yatube.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,12 +53,21 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Замер времени отрисовки каждого шаблона и include в метрики запроса
+TEMPLATE_PROFILING = os.environ.get('YATUBE_TEMPLATE_PROFILING') == '1'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.template_backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Разобранные шаблоны кешируются и при DEBUG; в разработке
+            # изменённый на диске файл перечитывается (check_mtime)
+            'loaders': [
+                ('yatube.template_loaders.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ], DEBUG, TEMPLATE_PROFILING),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -70,11 +81,95 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Сколько запросов ASGI-переходник (yatube/asgi.py) обрабатывает
+# одновременно: размер пула потоков, в котором работают view и ORM
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 8))
+
+# Профиль SQLite для продакшена: WAL (читатели не ждут пишущих),
+# synchronous = normal (в WAL надёжно и без fsync на каждый коммит),
+# страничный кеш 64 МБ, отображение файла в память до 256 МБ и ожидание
+# блокировки до 20 секунд вместо немедленной ошибки "database is locked".
+# Соединения живут CONN_MAX_AGE секунд и не переоткрываются на каждый запрос
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 20 * 1000,
+    'temp_store': 'memory',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.db_backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'timeout': 20,
+            'pragmas': SQLITE_PRAGMAS,
+            # запись в транзакции ждёт блокировку, а не падает сразу
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Реплики для чтения лент и страниц записей: пути к файлам SQLite через
+# запятую, которые заполняет manage.py sync_replicas. В продакшене здесь
+# описываются реплики СУБД с настоящей репликацией
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')),
+        start=1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'yatube.db_backends.sqlite3',
+        'NAME': path,
+        # sync_replicas заменяет файл через os.replace, а постоянное
+        # соединение читало бы прежний файл: соединение к реплике
+        # открывается заново в каждом запросе
+        'CONN_MAX_AGE': 0,
+        # файл реплики подменяется целиком, поэтому без WAL: иначе
+        # старый файл -wal применился бы к новой копии
+        'OPTIONS': {
+            'pragmas': {
+                'query_only': 'on',
+                'cache_size': SQLITE_PRAGMAS['cache_size'],
+                'mmap_size': SQLITE_PRAGMAS['mmap_size'],
+            },
+        },
+        # в тестах реплика - та же тестовая БД
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['yatube.db_router.ReplicaRouter']
+# Сколько секунд после записи пользователь читает только с основной БД
+REPLICA_PIN_SECONDS = 15
+# Сколько секунд не выбирать реплику, на которой упал запрос
+REPLICA_RETRY_SECONDS = 30
+
+# Двухуровневый кеш: LRU в памяти воркера поверх общего для всех воркеров
+# файлового кеша. В продакшене 'shared' заменяется на Redis или memcached
+CACHES = {
+    'default': {
+        'BACKEND': 'yatube.cache.TieredCache',
+        'LOCATION': 'yatube',
+        'TIMEOUT': 60 * 15,
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'LOCAL_MAX_ENTRIES': 2000,
+            'LOCAL_MAX_BYTES': 32 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 5,
+            'STATS_FLUSH_INTERVAL': 30,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'TIMEOUT': 60 * 15,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -111,4 +206,91 @@ LOGIN_REDIRECT_URL = 'index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Метрики запросов: INFO - строка JSON на каждый запрос и сводка
+# перцентилей каждые REQUEST_METRICS_SUMMARY_EVERY запросов
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        'yatube.db': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'yatube.throttle': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'yatube.write_queue': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+REQUEST_METRICS_SUMMARY_EVERY = 1000
+
 PAGINATOR_DEFAULT_SIZE = 10
+# 'numbered' - страницы по номерам (COUNT + OFFSET),
+# 'keyset' - страницы по курсору (pub_date, id), без COUNT и OFFSET
+PAGINATOR_MODE = 'numbered'
+# Сколько номеров страниц показывать вокруг текущей и на концах списка
+PAGINATOR_ON_EACH_SIDE = 2
+PAGINATOR_ON_ENDS = 1
+# Начиная с какого значения счётчика записей лента не считает COUNT(*),
+# а показывает "около N страниц" по счётчику
+PAGINATOR_ESTIMATE_THRESHOLD = 10000
+
+# Время жизни закешированных страниц лент, секунды. Страницы сбрасываются
+# раньше, при сохранении или удалении записи в ленте
+FEED_CACHE_TIMEOUT = 60 * 15
+# Время жизни страниц каталога подборок: новые записи не сбрасывают их,
+# поэтому число записей и дата последней отстают не больше чем на столько
+GROUP_DIRECTORY_CACHE_TIMEOUT = 60
+
+# Готовые ленты авторов и подборок: id последних TIMELINE_SIZE записей
+# каждой ленты хранятся в кеше и дописываются при публикации
+# (posts/timelines.py); пересобираются manage.py rebuild_timelines
+POSTS_TIMELINES = os.environ.get('YATUBE_TIMELINES') == '1'
+TIMELINE_SIZE = 1000
+# Сколько секунд живёт собранный массив ленты: дописывание новых записей
+# не продлевает его, и ошибки гонок исправляются пересборкой
+TIMELINE_TIMEOUT = 60 * 10
+
+# Отложенная запись новых постов (posts/write_queue.py): фоновый поток
+# пишет их пачками по WRITE_QUEUE_BATCH_SIZE или раз в WRITE_QUEUE_FLUSH_MS
+POSTS_WRITE_QUEUE = os.environ.get('YATUBE_WRITE_QUEUE') == '1'
+WRITE_QUEUE_BATCH_SIZE = 100
+WRITE_QUEUE_FLUSH_MS = 50
+
+# Поле подборки в форме записи - ввод начала названия с подсказками
+# (posts/widgets.py) вместо списка всех подборок
+POSTS_GROUP_TYPEAHEAD = os.environ.get('YATUBE_GROUP_TYPEAHEAD') == '1'
+
+# Ограничение частоты записей (yatube/throttling.py): для каждого вида
+# ключа - ёмкость корзины токенов и за сколько секунд она наполняется.
+# 'posts_write' - создание и правка записей
+THROTTLE_RATES = {
+    'posts_write': {
+        'user': (30, 60),
+        'ip': (120, 60),
+    },
+}
+
+# Тесты держат файловый кеш во временном каталоге (yatube/test_runner.py)
+TEST_RUNNER = 'yatube.test_runner.TemporaryCacheRunner'
+
+# Количество записей в RSS/Atom лентах
+SYNDICATION_FEED_SIZE = 20
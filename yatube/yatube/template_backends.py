@@ -0,0 +1,27 @@
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from .metrics import record_template_time
+
+
+class TimedTemplate(Template):
+    """Шаблон, сообщающий время отрисовки в метрики текущего запроса."""
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record_template_time(time.perf_counter() - started)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates с замером времени отрисовки шаблонов."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
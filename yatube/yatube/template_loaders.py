@@ -0,0 +1,66 @@
+import os
+import time
+
+from django.template.loaders import cached
+
+from .metrics import record_template_profile
+
+
+class Loader(cached.Loader):
+    """Кеширующий загрузчик шаблонов, включаемый независимо от DEBUG.
+
+    аргументы (после списка вложенных загрузчиков):
+    check_mtime - перечитывать шаблон, если его файл изменился на диске;
+                  для разработки: стоит один os.stat на шаблон при показе
+    profile - замерять время отрисовки каждого шаблона, в том числе
+              подключённых через include и extends, в метрики запроса
+    """
+
+    def __init__(self, engine, loaders, check_mtime=False, profile=False):
+        super().__init__(engine, loaders)
+        self.check_mtime = check_mtime
+        self.profile = profile
+        self.mtimes = {}
+
+    def get_template(self, template_name, skip=None):
+        template = super().get_template(template_name, skip)
+        if self.check_mtime and self.is_stale(template):
+            self.reset()
+            template = super().get_template(template_name, skip)
+        if self.check_mtime and template.origin.name not in self.mtimes:
+            self.mtimes[template.origin.name] = self.mtime(template)
+        if self.profile and not getattr(template, 'is_profiled', False):
+            self.add_profiling(template)
+        return template
+
+    @staticmethod
+    def mtime(template):
+        try:
+            return os.stat(template.origin.name).st_mtime
+        except OSError:
+            return None
+
+    def is_stale(self, template):
+        loaded = self.mtimes.get(template.origin.name)
+        return loaded is not None and loaded != self.mtime(template)
+
+    def reset(self):
+        super().reset()
+        self.mtimes.clear()
+
+    @staticmethod
+    def add_profiling(template):
+        # _render вызывают и Template.render, и ExtendsNode для родителя,
+        # поэтому замер на нём видит все уровни наследования и include
+        render = template._render
+        name = template.origin.template_name
+
+        def timed_render(context):
+            started = time.perf_counter()
+            try:
+                return render(context)
+            finally:
+                record_template_profile(name, time.perf_counter() - started)
+
+        template._render = timed_render
+        template.is_profiled = True
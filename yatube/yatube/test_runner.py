@@ -0,0 +1,41 @@
+"""Запуск тестов с файловым кешем во временном каталоге.
+
+Тесты чистят кеш перед каждым тестом (cache.clear()); с настройками
+проекта это стирало бы рабочий каталог yatube/cache. На время тестов
+каталоги всех FileBasedCache из CACHES переносятся во временный.
+"""
+import copy
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+FILE_CACHE_BACKEND = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+def temporary_caches(directory):
+    """CACHES проекта, где файловые кеши лежат в каталоге directory."""
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, params in caches.items():
+        if params['BACKEND'] == FILE_CACHE_BACKEND:
+            params['LOCATION'] = os.path.join(directory, alias)
+    return caches
+
+
+class TemporaryCacheRunner(DiscoverRunner):
+    """DiscoverRunner, который не трогает файловый кеш проекта."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix='yatube-test-cache-')
+        self.cache_override = override_settings(
+            CACHES=temporary_caches(self.cache_dir))
+        self.cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_override.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,165 @@
+"""Ограничение частоты записей: корзина токенов на пользователя и на IP.
+
+Корзина вмещает capacity токенов и наполняется равномерно за period
+секунд, каждый POST-запрос тратит из неё один токен. Пока корзина пуста,
+view отвечает 429 с заголовком Retry-After - через сколько секунд
+появится следующий токен. Так серия записей одного аккаунта или бота не
+держит блокировку записи SQLite и не задерживает читателей.
+
+Запрос тратит токены из корзин пользователя и IP, только если они есть
+в обеих: отклонённые запросы одного пользователя не опустошают корзину
+IP, общую с другими.
+
+Корзины хранятся в кеше проекта, общем для воркеров. Если кеш
+недоступен, они живут в памяти процесса: ограничение становится
+отдельным для каждого воркера, но продолжает работать. Чтение и запись
+корзины в кеше не атомарны, поэтому при одновременных запросах предел
+соблюдается приблизительно.
+"""
+import functools
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .metrics import record_throttled
+
+logger = logging.getLogger('yatube.throttle')
+
+THROTTLE_KEY = 'throttle:{scope}:{kind}:{ident}'
+
+
+def refill(state, capacity, period, now):
+    """Потратить токен из корзины.
+
+    аргументы:
+    state - (токенов, время обновления) или None для полной корзины
+    capacity, period - ёмкость корзины и время её наполнения, секунды
+    now - текущее время, time.time()
+
+    Возвращает новое состояние и сколько секунд ждать токена
+    (0 - токен потрачен, запрос пропускается).
+    """
+    rate = capacity / period
+    tokens, updated = state or (capacity, now)
+    tokens = min(capacity, tokens + max(0, now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalBuckets:
+    """Корзины в памяти процесса на случай недоступного кеша."""
+
+    max_entries = 10000
+
+    def __init__(self):
+        # key -> (состояние, срок годности по time.monotonic)
+        self.store = {}
+        self.lock = threading.Lock()
+
+    def take(self, buckets, now):
+        with self.lock:
+            if len(self.store) >= self.max_entries:
+                self.prune()
+            refilled = [
+                (key, period,
+                 *refill(self.store.get(key, (None, None))[0],
+                         capacity, period, now))
+                for key, capacity, period in buckets]
+            wait = max((wait for *_, wait in refilled), default=0)
+            if not wait:
+                expires = time.monotonic()
+                for key, period, state, _ in refilled:
+                    self.store[key] = (state, expires + period)
+            return wait
+
+    def prune(self):
+        # корзина с истёкшим сроком уже полна и равна отсутствующей
+        now = time.monotonic()
+        for key in [key for key, (_, expires) in self.store.items()
+                    if expires <= now]:
+            del self.store[key]
+
+    def clear(self):
+        with self.lock:
+            self.store.clear()
+
+
+local_buckets = LocalBuckets()
+
+
+def take(buckets):
+    """Потратить по токену из каждой корзины, если токен есть во всех.
+
+    Если хоть в одной корзине токена нет, не тратится ни один.
+
+    аргументы:
+    buckets - [(ключ корзины, ёмкость, секунд на наполнение)]
+
+    Возвращает, сколько секунд ждать токена в самой пустой корзине
+    (0 - токены потрачены, запрос пропускается).
+    """
+    now = time.time()
+    try:
+        refilled = [(key, period,
+                     *refill(cache.get(key), capacity, period, now))
+                    for key, capacity, period in buckets]
+        wait = max((wait for *_, wait in refilled), default=0)
+        if not wait:
+            for key, period, state, _ in refilled:
+                # через period секунд корзина снова полна, и запись
+                # не нужна
+                cache.set(key, state, math.ceil(period))
+    except Exception:
+        logger.warning('Кеш недоступен, ограничение частоты в памяти '
+                       'процесса', exc_info=True)
+        return local_buckets.take(buckets, now)
+    return wait
+
+
+def identities(request):
+    """Ключи корзин запроса: (вид, идентификатор)."""
+    if request.user.is_authenticated:
+        yield 'user', request.user.pk
+    # за обратным прокси REMOTE_ADDR должен выставлять сам прокси
+    yield 'ip', request.META.get('REMOTE_ADDR', '')
+
+
+def throttle(scope):
+    """Ограничить частоту POST-запросов к view по пользователю и IP.
+
+    аргументы:
+    scope - имя ограничения в settings.THROTTLE_RATES:
+            {вид: (ёмкость корзины, секунд на её наполнение)}
+    """
+
+    def decorator(view):
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'POST':
+                return view(request, *args, **kwargs)
+            rates = settings.THROTTLE_RATES.get(scope, {})
+            wait = take([
+                (THROTTLE_KEY.format(scope=scope, kind=kind, ident=ident),
+                 *rates[kind])
+                for kind, ident in identities(request) if kind in rates])
+            if not wait:
+                return view(request, *args, **kwargs)
+
+            record_throttled(scope)
+            retry_after = math.ceil(wait)
+            response = HttpResponse(
+                f'Слишком много запросов, повторите через {retry_after} с.',
+                content_type='text/plain; charset=utf-8', status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+
+        return wrapper
+
+    return decorator